@@ -0,0 +1,80 @@
+"""Compare load times of the ideas dataset: PyYAML, the SQLite store and their msgpack snapshots.
+
+Uses the YAML given on the command line (default gsoc_ideasdata.yaml). If it
+does not exist, a synthetic dataset of 185 organizations is generated. The
+server loads through StoreDataset, so the last two rows are its restart cost
+without and with a snapshot for the store's revision. Run with:
+
+    python benchmark_dataset_load.py [path/to/gsoc_ideasdata.yaml]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import yaml
+
+from dataset import build_snapshot, compile_dataset, read_snapshot
+from ideas_store import IdeasStore, StoreDataset
+
+REPEATS = 5
+
+
+def make_synthetic_yaml(path, organizations=185, ideas_per_org=13, words_per_idea=400):
+    random.seed(0)
+    vocabulary = ["python", "rust", "compiler", "webassembly", "cuda", "mentor", "project",
+                  "machine", "learning", "graph", "database", "kernel", "browser", "api"]
+    orgs = []
+    for org_id in range(1, organizations + 1):
+        ideas = [" ".join(random.choice(vocabulary) for _ in range(words_per_idea)) for _ in range(ideas_per_org)]
+        content = "\n~~~~~~~~~~\n".join(ideas)
+        orgs.append({
+            'organization_id': org_id,
+            'organization_name': f"Organization {org_id}",
+            'no_of_ideas': ideas_per_org,
+            'gsocorganization_dev_url': f"https://www.gsocorganizations.dev/organization/org-{org_id}/",
+            'idea_list_url': f"https://github.com/org-{org_id}/ideas",
+            'ideas_content': content,
+            'totalCharacters_of_ideas_content_parent': len(content),
+            'totalwords_of_ideas_content_parent': len(content.split()),
+            'totalTokenCount_of_ideas_content_parent': len(content) // 4
+        })
+    with open(path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump({'organizations': orgs}, file, sort_keys=False, allow_unicode=True)
+
+
+def best_of(label, func):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<38} {min(timings) * 1000:>9.1f} ms")
+
+
+def load_with(loader, path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return compile_dataset(yaml.load(file, Loader=loader))
+
+
+if __name__ == "__main__":
+    yaml_path = sys.argv[1] if len(sys.argv) > 1 else "gsoc_ideasdata.yaml"
+    workdir = tempfile.mkdtemp()
+    if not os.path.exists(yaml_path):
+        yaml_path = os.path.join(workdir, "gsoc_ideasdata.yaml")
+        make_synthetic_yaml(yaml_path)
+        print(f"Generated synthetic dataset at {yaml_path}")
+    snapshot_path = build_snapshot(yaml_path, os.path.join(workdir, "ideas.snapshot.msgpack"))
+    store = IdeasStore(os.path.join(workdir, "store.sqlite3"))
+    store.import_yaml(yaml_path)
+    StoreDataset(store).load()
+
+    print(f"YAML: {os.path.getsize(yaml_path) / 1e6:.1f} MB, "
+          f"snapshot: {os.path.getsize(snapshot_path) / 1e6:.1f} MB, best of {REPEATS}")
+    best_of("yaml.safe_load (pure Python)", lambda: load_with(yaml.SafeLoader, yaml_path))
+    if hasattr(yaml, 'CSafeLoader'):
+        best_of("yaml CSafeLoader (libyaml)", lambda: load_with(yaml.CSafeLoader, yaml_path))
+    best_of("msgpack snapshot", lambda: read_snapshot(snapshot_path))
+    best_of("SQLite store", lambda: compile_dataset(store.document()))
+    best_of("SQLite store snapshot (StoreDataset)", lambda: StoreDataset(store).load())
@@ -0,0 +1,79 @@
+"""Load benchmark for /query with stubbed Gemini and Chroma backends.
+
+Both backends are replaced by stubs that sleep for a fixed latency, so the
+numbers show how well the request path overlaps in-flight network calls rather
+than how fast the real services are. Run with:
+
+    python benchmark_query.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+EMBED_LATENCY = 0.05  # seconds, roughly one Gemini embed_content round trip
+QUERY_LATENCY = 0.02  # seconds, roughly one Chroma query round trip
+CONCURRENCY_LEVELS = [1, 10, 100]
+REQUESTS_PER_CLIENT = 5
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "embedding_cache.sqlite3")
+
+import main  # noqa: E402  (needs the environment above)
+
+
+class StubCollection:
+    """Mimics the parts of a Chroma collection that /query uses"""
+
+    def query(self, query_embeddings, n_results, include, where=None):
+        time.sleep(QUERY_LATENCY)
+        rows = range(len(query_embeddings))
+        return {
+            'ids': [[f"stub-{i}" for i in range(n_results)] for _ in rows],
+            'documents': [[f"idea {i}" for i in range(n_results)] for _ in rows],
+            'metadatas': [[{'organization_name': 'stub'} for _ in range(n_results)] for _ in rows],
+            'distances': [[0.1 * i for i in range(n_results)] for _ in rows]
+        }
+
+def stub_embed(texts):
+    time.sleep(EMBED_LATENCY)
+    return [[0.1] * 768 for _ in texts]
+
+
+async def run_level(client, concurrency):
+    counter = 0
+
+    async def worker(worker_id):
+        nonlocal counter
+        for i in range(REQUESTS_PER_CLIENT):
+            # Unique query text so every request misses the embedding cache
+            counter += 1
+            response = await client.post("/query", json={"query": f"query {concurrency}-{worker_id}-{i}-{counter}"})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = concurrency * REQUESTS_PER_CLIENT
+    return total, elapsed
+
+
+async def main_async():
+    main.embed_with_gemini = stub_embed
+    main.get_collection = lambda: StubCollection()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        serial_latency = EMBED_LATENCY + QUERY_LATENCY
+        print(f"Stub latency per request: {serial_latency * 1000:.0f} ms, "
+              f"query workers: {main.QUERY_WORKERS}")
+        print(f"{'clients':>8} {'requests':>9} {'seconds':>8} {'req/s':>8}")
+        for concurrency in CONCURRENCY_LEVELS:
+            total, elapsed = await run_level(client, concurrency)
+            print(f"{concurrency:>8} {total:>9} {elapsed:>8.2f} {total / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -0,0 +1,327 @@
+"""Shared headless Chrome workers for the scrapers.
+
+BrowserPool runs N worker processes, each owning one driver, and maps a
+task function over many pages in parallel. A task is a module-level function
+called as func(driver, *args); it runs in the worker process, so it and its
+arguments must be picklable.
+
+A driver that crashes is replaced and the task retried, and a worker process
+that dies is restarted, so one bad page never ends the run. Instead of fixed
+sleeps, pages are waited on with wait_until_ready: document ready, then an
+optional selector, then a short quiet period with no DOM mutations and no
+new network requests.
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from webdriver_manager.chrome import ChromeDriverManager
+
+DEFAULT_WORKERS = int(os.getenv("BROWSER_WORKERS", "4"))
+HEADLESS = os.getenv("BROWSER_HEADLESS", "1") != "0"
+DEFAULT_WAIT_SECONDS = 10.0
+# A page counts as settled after this long without DOM mutations or new requests
+QUIET_SECONDS = 0.5
+POLL_SECONDS = 0.1
+# Fresh browser after this many pages, Chrome's memory use only grows
+RECYCLE_AFTER_TASKS = 50
+MAX_TASK_RETRIES = 1
+
+_MUTATION_COUNT_JS = """
+if (!window.__scraperMutations) {
+    window.__scraperMutations = {count: 0};
+    new MutationObserver(function (records) { window.__scraperMutations.count += records.length; })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return window.__scraperMutations.count;
+"""
+_RESOURCE_COUNT_JS = "return performance.getEntriesByType('resource').length;"
+
+
+def setup_driver(headless: bool = HEADLESS):
+    """Set up and configure the WebDriver"""
+    print("Setting up the WebDriver...")
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    else:
+        options.add_argument('--start-maximized')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    service = Service(ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=options)
+
+
+def wait_for_document_ready(driver, timeout: float = DEFAULT_WAIT_SECONDS):
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_SECONDS).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_selector(driver, css_selector: str, timeout: float = DEFAULT_WAIT_SECONDS):
+    """The first element matching css_selector once present, or None after timeout"""
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_SECONDS).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
+        )
+    except TimeoutException:
+        return None
+
+
+def _wait_until_unchanged(driver, scripts, quiet_seconds: float, timeout: float):
+    """Poll the counters returned by scripts until none changes for quiet_seconds"""
+    deadline = time.monotonic() + timeout
+    last = None
+    last_change = time.monotonic()
+    while time.monotonic() < deadline:
+        current = tuple(driver.execute_script(script) for script in scripts)
+        if current != last:
+            last = current
+            last_change = time.monotonic()
+        elif time.monotonic() - last_change >= quiet_seconds:
+            return True
+        time.sleep(POLL_SECONDS)
+    return False
+
+
+def wait_for_dom_stable(driver, quiet_seconds: float = QUIET_SECONDS, timeout: float = DEFAULT_WAIT_SECONDS):
+    return _wait_until_unchanged(driver, [_MUTATION_COUNT_JS], quiet_seconds, timeout)
+
+
+def wait_for_network_idle(driver, quiet_seconds: float = QUIET_SECONDS, timeout: float = DEFAULT_WAIT_SECONDS):
+    return _wait_until_unchanged(driver, [_RESOURCE_COUNT_JS], quiet_seconds, timeout)
+
+
+def wait_until_ready(driver, selector: str = None, timeout: float = DEFAULT_WAIT_SECONDS,
+                     quiet_seconds: float = QUIET_SECONDS):
+    """Wait for a loaded page to settle; a static page costs about quiet_seconds.
+
+    Returns False if any condition timed out, the page is usually still
+    worth reading then.
+    """
+    deadline = time.monotonic() + timeout
+    ready = wait_for_document_ready(driver, timeout)
+    if selector:
+        ready = wait_for_selector(driver, selector, max(0.0, deadline - time.monotonic())) is not None and ready
+    settled = _wait_until_unchanged(
+        driver, [_MUTATION_COUNT_JS, _RESOURCE_COUNT_JS], quiet_seconds, max(quiet_seconds, deadline - time.monotonic())
+    )
+    return ready and settled
+
+
+def driver_is_alive(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _worker(worker_index, connection, driver_factory, headless, max_task_retries, recycle_after):
+    """Worker process loop: run the tasks sent over connection on one driver, replacing it when it dies"""
+    driver = None
+    tasks_on_driver = 0
+    try:
+        while True:
+            try:
+                task = connection.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            key, func, args = task
+            attempt = 0
+            while True:
+                try:
+                    if driver is None or tasks_on_driver >= recycle_after:
+                        if driver is not None:
+                            _quit(driver)
+                            driver = None
+                        driver = driver_factory(headless)
+                        tasks_on_driver = 0
+                    tasks_on_driver += 1
+                    value = func(driver, *args)
+                    error = None
+                except Exception as e:
+                    value, error = None, f"{type(e).__name__}: {str(e)}"
+                # Scraper functions swallow their own errors, so check the driver whenever nothing came back
+                if (error is not None or not value) and driver is not None and not driver_is_alive(driver):
+                    print(f"[worker {worker_index}] Browser crashed on {key}, starting a new one")
+                    _quit(driver)
+                    driver = None
+                    if attempt < max_task_retries:
+                        attempt += 1
+                        continue
+                    error = error or "browser crashed"
+                break
+            connection.send((key, (value, error)))
+    finally:
+        if driver is not None:
+            _quit(driver)
+
+
+class BrowserPool:
+    """N worker processes with one headless browser each.
+
+    Use as a context manager and call map() as often as needed; the browsers
+    stay open between calls. Each worker has its own pipe and is given one
+    task at a time, so the task of a worker that dies is always known, and a
+    worker dying mid-write cannot block the others the way a shared
+    multiprocessing.Queue (and its cross-process lock) can.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, headless: bool = HEADLESS, driver_factory=setup_driver,
+                 max_task_retries: int = MAX_TASK_RETRIES, recycle_after: int = RECYCLE_AFTER_TASKS):
+        self.workers = max(1, workers)
+        self.headless = headless
+        self.driver_factory = driver_factory
+        self.max_task_retries = max_task_retries
+        self.recycle_after = recycle_after
+        # spawn works the same on Windows, and forking a process that holds a driver is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        self.errors = {}
+
+    def _start_worker(self, index):
+        connection, worker_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker,
+            args=(index, worker_connection, self.driver_factory, self.headless,
+                  self.max_task_retries, self.recycle_after),
+            daemon=True
+        )
+        process.start()
+        # Only the worker holds its end now, so its death shows up here as EOF
+        worker_connection.close()
+        if index < len(self._connections):
+            self._connections[index].close()
+            self._connections[index] = connection
+        else:
+            self._connections.append(connection)
+        return process
+
+    def start(self):
+        self._connections = []
+        self._processes = [self._start_worker(i) for i in range(self.workers)]
+        print(f"Started {self.workers} browser workers")
+        return self
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def map(self, func, items, on_result=None):
+        """Run func(driver, *args) for every {key: args} item; returns {key: result}.
+
+        A task whose browser kept crashing, or that raised, has result None
+        and its error in self.errors. on_result(key, result) is called in
+        this process as results arrive.
+        """
+        results = {}
+        self.errors = {}
+        pending = deque(items)
+        in_flight = {}  # worker index -> key handed to it
+        retries = {}
+        self._dispatch(func, items, pending, in_flight)
+        while len(results) < len(items):
+            ready = wait(self._connections, timeout=1.0)
+            for connection in ready:
+                index = self._connections.index(connection)
+                try:
+                    key, (value, error) = connection.recv()
+                except (EOFError, OSError):
+                    # The worker exited; wait for it so _restart_dead_workers sees it dead
+                    self._processes[index].join(timeout=5)
+                    if self._processes[index].is_alive():
+                        self._processes[index].terminate()
+                        self._processes[index].join()
+                    continue
+                in_flight.pop(index, None)
+                if error:
+                    print(f"Browser task for {key} failed: {error}")
+                    self.errors[key] = error
+                results[key] = value
+                if on_result is not None:
+                    on_result(key, value)
+            self._restart_dead_workers(func, items, pending, in_flight, retries, results, on_result)
+            self._dispatch(func, items, pending, in_flight)
+        return results
+
+    def _dispatch(self, func, items, pending, in_flight):
+        """Hand the next pending task to every worker that has none"""
+        for index, connection in enumerate(self._connections):
+            if not pending:
+                return
+            if index in in_flight:
+                continue
+            key = pending.popleft()
+            in_flight[index] = key
+            try:
+                connection.send((key, func, tuple(items[key])))
+            except OSError:
+                pass  # The worker is gone, _restart_dead_workers hands the task out again
+
+    def _restart_dead_workers(self, func, items, pending, in_flight, retries, results, on_result):
+        for index, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            print(f"Browser worker {index} died (exit code {process.exitcode}), restarting it")
+            self._processes[index] = self._start_worker(index)
+            key = in_flight.pop(index, None)
+            if key is None or key in results:
+                continue
+            retries[key] = retries.get(key, 0) + 1
+            if retries[key] <= self.max_task_retries:
+                pending.appendleft(key)
+            else:
+                results[key] = None
+                self.errors[key] = f"browser worker died (exit code {process.exitcode})"
+                if on_result is not None:
+                    on_result(key, None)
+
+
+def run_browser_tasks(func, items, workers: int = DEFAULT_WORKERS, **pool_options):
+    """One-off BrowserPool.map with its own pool"""
+    if not items:
+        return {}
+    with BrowserPool(min(workers, len(items)), **pool_options) as pool:
+        return pool.map(func, items)
@@ -0,0 +1,158 @@
+import re
+
+# text-embedding-004 accepts 2048 tokens per text; smaller chunks also embed more precisely
+DEFAULT_CHUNK_MAX_TOKENS = 512
+DEFAULT_CHUNK_OVERLAP_TOKENS = 64
+
+# Rough stand-in for the model tokenizer: words, numbers and punctuation marks count one each
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_BLOCK_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Markdown headings, "Project 3: ..." style titles and short ALL CAPS lines
+_HEADING = re.compile(r"^\s*(#{1,6}\s+\S.*|(?i:project|idea|title|topic)\b.{0,100}|[A-Z0-9][A-Z0-9 &/:()\-]{2,80})\s*$")
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+
+def _spans(text, pattern, start, end):
+    """Split text[start:end] on pattern into stripped (start, end) spans"""
+    spans = []
+    position = start
+    for match in pattern.finditer(text, start, end):
+        spans.append((position, match.start()))
+        position = match.end()
+    spans.append((position, end))
+    stripped = []
+    for span_start, span_end in spans:
+        piece = text[span_start:span_end]
+        if piece.strip():
+            span_start += len(piece) - len(piece.lstrip())
+            span_end -= len(piece) - len(piece.rstrip())
+            stripped.append((span_start, span_end))
+    return stripped
+
+
+def _blocks(text):
+    """Paragraph spans, with a heading line always starting a new block; yields (start, end, is_heading)"""
+    for start, end in _spans(text, _BLOCK_BREAK, 0, len(text)):
+        starts = [start]
+        line_start = start
+        for line in text[start:end].split('\n'):
+            if line_start > start and _HEADING.match(line):
+                starts.append(line_start)
+            line_start += len(line) + 1
+        for block_start, block_end in zip(starts, starts[1:] + [end]):
+            block_end = block_start + len(text[block_start:block_end].rstrip())
+            first_line = text[block_start:block_end].split('\n', 1)[0]
+            yield block_start, block_end, bool(_HEADING.match(first_line))
+
+
+def _pieces(text, max_tokens, overlap_tokens):
+    """Spans of at most max_tokens each: blocks, or sentences / token windows of oversized blocks"""
+    for start, end, is_heading in _blocks(text):
+        if count_tokens(text[start:end]) <= max_tokens:
+            yield start, end, is_heading
+            continue
+        for sentence_start, sentence_end in _spans(text, _SENTENCE_END, start, end):
+            if count_tokens(text[sentence_start:sentence_end]) <= max_tokens:
+                yield sentence_start, sentence_end, is_heading
+                is_heading = False
+                continue
+            # No usable boundary left, fall back to overlapping windows of tokens
+            tokens = list(_TOKEN.finditer(text, sentence_start, sentence_end))
+            step = max(1, max_tokens - overlap_tokens)
+            for i in range(0, max(1, len(tokens) - overlap_tokens), step):
+                window = tokens[i:i + max_tokens]
+                yield window[0].start(), window[-1].end(), is_heading
+                is_heading = False
+
+
+def chunk_idea(text: str, max_tokens: int = DEFAULT_CHUNK_MAX_TOKENS,
+               overlap_tokens: int = DEFAULT_CHUNK_OVERLAP_TOKENS):
+    """Split one idea into overlapping chunks of at most max_tokens.
+
+    Returns [(start, end)] character offsets into text. Chunks break at
+    headings and paragraphs where possible, then at sentences, and repeat up
+    to overlap_tokens worth of trailing pieces from the previous chunk. An
+    idea that already fits is a single chunk covering the whole text, so its
+    embedding is the same as before chunking.
+    """
+    if count_tokens(text) <= max_tokens:
+        return [(0, len(text))]
+
+    pieces = [(start, end, is_heading, count_tokens(text[start:end]))
+              for start, end, is_heading in _pieces(text, max_tokens, overlap_tokens)]
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        start, end, is_heading, tokens = piece
+        # Start a new chunk at a heading once the current one has some substance
+        heading_break = is_heading and current_tokens >= max_tokens // 4
+        if current and (current_tokens + tokens > max_tokens or heading_break):
+            chunks.append((current[0][0], current[-1][1]))
+            overlap = []
+            overlap_total = 0
+            if not heading_break:
+                for previous in reversed(current):
+                    if overlap_total + previous[3] > overlap_tokens or overlap_total + previous[3] + tokens > max_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_total += previous[3]
+            current, current_tokens = overlap, overlap_total
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append((current[0][0], current[-1][1]))
+    return chunks
+
+
+def aggregate_chunk_results(formatted_results, n_results: int, scoring: str = "max"):
+    """Collapse ranked chunk results into idea results.
+
+    Each idea keeps the fields of its best chunk, plus idea_score (the max or
+    the sum of its chunk scores, using fusion_score when present) and the
+    offsets of every matched chunk. Returns the top n_results ideas.
+    """
+    ideas = {}
+    order = []
+    for result in formatted_results:
+        score = result.get('fusion_score', result.get('similarity_score')) or 0.0
+        metadata = result.get('metadata') or {}
+        idea_id = metadata.get('idea_id', result['id'])
+        match = {
+            'id': result['id'],
+            'chunk_index': metadata.get('chunk_index', 0),
+            'chunk_start': metadata.get('chunk_start'),
+            'chunk_end': metadata.get('chunk_end'),
+            'score': score
+        }
+        if idea_id not in ideas:
+            ideas[idea_id] = dict(result, idea_id=idea_id, idea_score=score, matched_chunks=[match])
+            order.append(idea_id)
+            continue
+        idea = ideas[idea_id]
+        idea['matched_chunks'].append(match)
+        if scoring == "sum":
+            idea['idea_score'] += score
+        else:
+            idea['idea_score'] = max(idea['idea_score'], score)
+    # Stable sort keeps the chunk ranking order between ideas with equal scores
+    ranked = sorted((ideas[idea_id] for idea_id in order), key=lambda idea: idea['idea_score'], reverse=True)
+    return ranked[:n_results]
+
+
+def assemble_idea(chunks):
+    """Rebuild an idea's text from its stored chunks [(metadata, document)], dropping the overlaps"""
+    text = ''
+    end = 0
+    for metadata, document in sorted(chunks, key=lambda chunk: chunk[0].get('chunk_start', 0)):
+        start = metadata.get('chunk_start', 0)
+        if start >= end:
+            text += ('\n\n' if text else '') + document
+        else:
+            text += document[end - start:]
+        end = max(end, metadata.get('chunk_end', start + len(document)))
+    return text
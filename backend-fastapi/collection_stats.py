@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+
+# Organization-level totals copied from the YAML into every idea's metadata
+ORG_TOTAL_FIELDS = {
+    'totalTokenCount_of_ideas_content_parent': 'tokens',
+    'totalwords_of_ideas_content_parent': 'words',
+    'totalCharacters_of_ideas_content_parent': 'characters',
+}
+
+HISTOGRAM_BUCKETS = [(1, 1), (2, 5), (6, 10), (11, 20), (21, 50), (51, None)]
+
+
+def _bucket_label(low, high):
+    if high is None:
+        return f"{low}+"
+    return str(low) if low == high else f"{low}-{high}"
+
+
+class CollectionStats:
+    """Aggregates over the stored ideas, kept up to date by ingestion.
+
+    Ingestion calls add() for every upserted batch and remove() with the
+    metadata of every deleted batch, so /chromadb-stats never has to scan the
+    collection. Ideas are stored as chunks; every stored chunk counts towards
+    total_chunks but only the first chunk of an idea counts as an idea. The
+    near-duplicate chunks a representative stands for (its 'duplicates'
+    metadata) are counted as if they were stored. The document is small (one
+    entry per organization) and is persisted as JSON so a restart does not
+    need a rebuild.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._summary = None
+        self._doc = self._empty()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self._doc = json.load(file)
+            except Exception as e:
+                print(f"Ignoring unreadable stats file {path}: {str(e)}")
+
+    @staticmethod
+    def _empty():
+        return {'total_records': 0, 'total_chunks': 0, 'idea_characters': 0, 'idea_words': 0, 'organizations': {}}
+
+    @property
+    def total_records(self):
+        return self._doc['total_records']
+
+    @property
+    def total_chunks(self):
+        return self._doc.get('total_chunks', 0)
+
+    def _apply(self, metadatas, sign):
+        doc = self._doc
+        expanded = []
+        for metadata in metadatas:
+            if not metadata:
+                continue
+            doc['total_chunks'] = doc.get('total_chunks', 0) + sign
+            expanded.append(metadata)
+            if metadata.get('duplicates'):
+                expanded.extend(json.loads(metadata['duplicates']))
+        for metadata in expanded:
+            if int(metadata.get('chunk_index', 0)) != 0:
+                continue
+            org_id = str(metadata.get('organization_id'))
+            org = doc['organizations'].setdefault(org_id, {
+                'organization_name': metadata.get('organization_name'),
+                'ideas': 0,
+                'idea_characters': 0,
+                'idea_words': 0
+            })
+            characters = int(metadata.get('idea_characters', 0))
+            words = int(metadata.get('idea_words', 0))
+            org['ideas'] += sign
+            org['idea_characters'] += sign * characters
+            org['idea_words'] += sign * words
+            doc['total_records'] += sign
+            doc['idea_characters'] += sign * characters
+            doc['idea_words'] += sign * words
+            if sign > 0:
+                org['organization_name'] = metadata.get('organization_name')
+                for field, key in ORG_TOTAL_FIELDS.items():
+                    if metadata.get(field) is not None:
+                        org[key] = int(metadata[field])
+            if org['ideas'] <= 0:
+                del doc['organizations'][org_id]
+        self._summary = None
+
+    def add(self, metadatas):
+        with self._lock:
+            self._apply(metadatas, 1)
+
+    def remove(self, metadatas):
+        with self._lock:
+            self._apply(metadatas, -1)
+
+    def rebuild(self, metadatas):
+        """Recompute everything from the full set of stored metadatas"""
+        with self._lock:
+            self._doc = self._empty()
+            self._apply(metadatas, 1)
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._doc, file)
+            os.replace(tmp_path, self.path)
+
+    def summary(self):
+        """The /chromadb-stats payload, recomputed only after the aggregates change"""
+        with self._lock:
+            if self._summary is not None:
+                return self._summary
+            doc = self._doc
+            organizations = doc['organizations'].values()
+            total = doc['total_records']
+
+            histogram = {_bucket_label(low, high): 0 for low, high in HISTOGRAM_BUCKETS}
+            for org in organizations:
+                for low, high in HISTOGRAM_BUCKETS:
+                    if org['ideas'] >= low and (high is None or org['ideas'] <= high):
+                        histogram[_bucket_label(low, high)] += 1
+                        break
+
+            org_totals = {key: sum(org.get(key, 0) for org in organizations) for key in ORG_TOTAL_FIELDS.values()}
+            names = sorted(org['organization_name'] for org in organizations if org.get('organization_name'))
+
+            self._summary = {
+                "total_records": total,
+                "total_chunks": doc.get('total_chunks', 0),
+                "unique_organizations": len(names),
+                "organization_names": names,
+                "sample_records": total,
+                "ideas_per_organization": {org['organization_name']: org['ideas'] for org in organizations},
+                "ideas_per_organization_histogram": histogram,
+                "average_ideas_per_organization": total / len(names) if names else 0.0,
+                "average_idea_characters": doc['idea_characters'] / total if total else 0.0,
+                "average_idea_words": doc['idea_words'] / total if total else 0.0,
+                "total_idea_characters": doc['idea_characters'],
+                "total_idea_words": doc['idea_words'],
+                "organization_content_totals": org_totals
+            }
+            return self._summary
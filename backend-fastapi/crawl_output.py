@@ -0,0 +1,144 @@
+"""Streaming JSON Lines output of a crawl, and its import into the ideas store.
+
+CrawlWriter keeps one file open for the whole crawl and writes one record
+per page:
+
+    {"url": ..., "title": ..., "fetched_at": ..., "content_hash": ..., "changed": ..., "text": ...}
+
+fetched_at is when the page's text was fetched, which for a page answered
+from the page cache is the original fetch, not this crawl.
+
+Writes go through a large buffer that is flushed every flush_every records,
+so for a plain .jsonl file a crash loses at most that many pages and a
+reader can follow the file while the crawl runs. A path ending in .gz is
+written gzip-compressed and is only a complete gzip file after close(); one
+cut short by a crash reads up to where it ends, with an error at the end.
+
+import_crawl() makes the pages of a crawl file the ideas_content of one
+organization in the ideas store, one idea per page, which the embedding sync
+at server startup then picks up like any other organization.
+
+    python crawl_output.py output.jsonl 42
+"""
+import gzip
+import json
+import sys
+import time
+
+from dataset import IDEA_SEPARATOR
+from ideas_store import IdeasStore
+from page_cache import content_hash
+
+YAML_FILE = "gsoc_ideasdata.yaml"
+DEFAULT_FLUSH_RECORDS = 50
+BUFFER_BYTES = 1 << 20
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8', buffering=BUFFER_BYTES)
+
+
+def crawl_record(page):
+    """The output record of a crawled page (a page_fetcher.page_result dict)"""
+    return {
+        'url': page['url'],
+        'title': page['title'],
+        'fetched_at': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(page['fetched_at'])),
+        'content_hash': content_hash(page['content']),
+        'changed': page['changed'],
+        'text': page['content']
+    }
+
+
+class CrawlWriter:
+    """One JSON line per page, into a file kept open until close()"""
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_RECORDS):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.records = 0
+        self._unflushed = 0
+        self._file = _open(path, 'w')
+
+    def write(self, page):
+        self._file.write(json.dumps(crawl_record(page), ensure_ascii=False) + "\n")
+        self.records += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            print(f"Wrote {self.records} pages to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_crawl(path: str):
+    """Records of a crawl file; a last line cut short by a crash, or the end of a truncated .gz, is skipped"""
+    with _open(path, 'r') as file:
+        number = 0
+        try:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable line {number} of {path}")
+        except EOFError:
+            # A gzip file that was never closed has no end-of-stream marker
+            print(f"{path} is truncated after line {number}, the crawl did not finish writing it")
+
+
+def crawl_ideas_content(records):
+    """ideas_content with one idea per page that has text: its title, URL and text"""
+    ideas = []
+    for record in records:
+        text = (record.get('text') or '').replace(IDEA_SEPARATOR, '').strip()
+        if not text:
+            continue
+        header = "\n".join(part for part in (record.get('title'), record['url']) if part)
+        ideas.append(f"{header}\n\n{text}")
+    return f"\n{IDEA_SEPARATOR}\n".join(ideas)
+
+
+def import_crawl(path: str, org_id, yaml_path: str = YAML_FILE, store: IdeasStore = None) -> bool:
+    """Replace organization org_id's ideas_content with the pages of a crawl file.
+
+    Hand edits to yaml_path are synced into the store first and the YAML is
+    exported again afterwards, as the scrapers do; pass yaml_path=None to
+    only touch the store.
+    """
+    store = store or IdeasStore()
+    if yaml_path:
+        store.sync_from_yaml(yaml_path)
+    ideas_content = crawl_ideas_content(read_crawl(path))
+    if not ideas_content:
+        print(f"No pages with text in {path}")
+        return False
+    if not store.update_organization(org_id, ideas_content=ideas_content):
+        return False
+    print(f"Imported {ideas_content.count(IDEA_SEPARATOR) + 1} pages from {path} into organization ID {org_id}")
+    if yaml_path:
+        store.export_yaml(yaml_path)
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python crawl_output.py <crawl file> <organization id>")
+        sys.exit(1)
+    if not import_crawl(sys.argv[1], int(sys.argv[2])):
+        sys.exit(1)
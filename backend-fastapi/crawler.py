@@ -0,0 +1,329 @@
+"""Breadth-first crawler over many sites at once.
+
+crawl() starts from any number of seed URLs and follows links that stay on
+the host of a seed, fetching up to max_pages_per_site pages per host. Pages
+come from page_fetcher.fetch_page over plain HTTP, many at a time; the ones
+that only render with JavaScript are handed to browser_fetch in waves and
+the links found there are followed as well.
+
+Every URL is normalized before it is queued (no fragment, lowercase host,
+no default port, no trailing slash, sorted query parameters), so the same
+page is fetched once however it is linked. The frontier is one FIFO per host
+with a set of every URL ever queued, and hosts are served round-robin, so a
+large site never holds up the small ones.
+
+Each host is asked for its robots.txt once. Disallowed URLs are skipped, and
+requests to a host start at least host_delay seconds apart, or the host's
+Crawl-delay when it asks for more (capped at MAX_CRAWL_DELAY_SECONDS).
+
+    python -c "from crawler import crawl; print(crawl(['http://127.0.0.1:8000/']))"
+"""
+import asyncio
+import re
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from page_fetcher import DEFAULT_TIMEOUT_SECONDS, USER_AGENT, HostLimiter, fetch_page, page_result
+
+DEFAULT_MAX_PAGES_PER_SITE = 50
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MAX_PER_HOST = 2
+DEFAULT_HOST_DELAY_SECONDS = 0.5
+MAX_CRAWL_DELAY_SECONDS = 10.0
+# Name matched against User-agent lines in robots.txt
+ROBOTS_AGENT = "gsoc-ideas-scraper"
+# Links to files that are not pages
+SKIP_EXTENSIONS = (
+    '.pdf', '.zip', '.gz', '.tar', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp',
+    '.mp4', '.mp3', '.css', '.js', '.woff', '.woff2', '.ttf', '.xml', '.json', '.ipynb'
+)
+
+
+def normalize_url(url: str, base: str = None):
+    """Canonical form of url (resolved against base), or None if it is not an http(s) page"""
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if scheme not in ('http', 'https') or not host:
+        return None
+    if ':' in host:
+        host = f"[{host}]"
+    if port is not None and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    path = re.sub(r'/{2,}', '/', parts.path)
+    if path.endswith('/'):
+        path = path.rstrip('/')
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path or '/', query, ''))
+
+
+def url_host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_page_url(url: str) -> bool:
+    return not urlsplit(url).path.lower().endswith(SKIP_EXTENSIONS)
+
+
+class Frontier:
+    """URLs still to crawl: one deque per host, and the set of every URL ever queued"""
+
+    def __init__(self, max_per_host: int = DEFAULT_MAX_PAGES_PER_SITE):
+        self.max_per_host = max_per_host
+        self.seen = set()
+        self.queued_per_host = {}
+        self._queues = {}  # host -> deque of URLs
+        self._hosts = deque()  # hosts with URLs waiting, in round-robin order
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def add(self, url: str) -> bool:
+        """Queue a normalized URL unless it was seen before or its host is full"""
+        if url in self.seen:
+            return False
+        host = url_host(url)
+        if self.queued_per_host.get(host, 0) >= self.max_per_host:
+            return False
+        self.seen.add(url)
+        self.queued_per_host[host] = self.queued_per_host.get(host, 0) + 1
+        if not self._queues.get(host):
+            self._queues[host] = deque()
+            self._hosts.append(host)
+        self._queues[host].append(url)
+        return True
+
+    def pop(self, next_slot=None):
+        """Next URL from the host that can be requested soonest, ties going round-robin"""
+        next_slot = next_slot or {}
+        host = min(self._hosts, key=lambda h: next_slot.get(h, 0.0))
+        self._hosts.remove(host)
+        url = self._queues[host].popleft()
+        if self._queues[host]:
+            self._hosts.append(host)
+        else:
+            del self._queues[host]
+        return url
+
+
+async def fetch_robots(client, origin: str) -> RobotFileParser:
+    """Parsed robots.txt of origin; a missing file allows everything, 401/403 forbids everything"""
+    parser = RobotFileParser(f"{origin}/robots.txt")
+    try:
+        response = await client.get(f"{origin}/robots.txt")
+    except httpx.HTTPError:
+        parser.allow_all = True
+        return parser
+    if response.status_code in (401, 403):
+        parser.disallow_all = True
+    elif response.status_code >= 400:
+        parser.allow_all = True
+    else:
+        parser.parse(response.text.splitlines())
+    return parser
+
+
+class Crawler:
+    """State of one crawl, kept across the HTTP and browser waves"""
+
+    def __init__(self, seeds, max_pages_per_site: int = DEFAULT_MAX_PAGES_PER_SITE,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_per_host: int = DEFAULT_MAX_PER_HOST,
+                 host_delay: float = DEFAULT_HOST_DELAY_SECONDS, timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 cache=None, on_page=None):
+        self.concurrency = max(1, concurrency)
+        self.max_per_host = max_per_host
+        self.host_delay = host_delay
+        self.timeout = timeout
+        self.cache = cache
+        self.on_page = on_page
+        self.frontier = Frontier(max_pages_per_site)
+        self.hosts = set()  # links are followed only on these hosts
+        self.seeds = set()
+        self.robots = {}  # origin -> RobotFileParser
+        self.next_slot = {}  # host -> monotonic time its next request may start
+        self.needs_browser = []
+        self.pages = 0
+        self.changed = []
+        self.failed = {}
+        self.blocked = set()  # URLs robots.txt disallows
+        for seed in seeds:
+            url = normalize_url(seed)
+            if url is None:
+                print(f"Skipping seed that is not an http(s) URL: {seed}")
+                continue
+            self.seeds.add(url)
+            self.hosts.add(url_host(url))
+            self.frontier.add(url)
+
+    def allowed(self, url: str) -> bool:
+        parser = self.robots.get(origin_of(url))
+        return parser is None or parser.can_fetch(ROBOTS_AGENT, url)
+
+    def follow(self, links, base: str):
+        """Queue the links of a page that stay on a crawled host"""
+        for link in links:
+            url = normalize_url(link, base)
+            if url is None or url in self.frontier.seen or url_host(url) not in self.hosts:
+                continue
+            if not is_page_url(url):
+                continue
+            # Known robots rules are checked now, so a blocked URL does not use up the host's pages
+            if self.allowed(url):
+                self.frontier.add(url)
+            else:
+                self.blocked.add(url)
+
+    def record(self, url: str, page):
+        """Count a crawled page, pass it to on_page and queue its links"""
+        if page['error'] or not page['content']:
+            self.failed[url] = page['error'] or "no content"
+            print(f"Failed: {url} ({self.failed[url]})")
+            return
+        self.pages += 1
+        if page['changed']:
+            self.changed.append(url)
+        final_url = normalize_url(page['final_url']) or url
+        if url in self.seeds and url_host(final_url) != url_host(url):
+            # The seed redirected to another host (e.g. www.), crawl that one instead
+            self.hosts.add(url_host(final_url))
+        self.frontier.seen.add(final_url)
+        if self.on_page is not None:
+            self.on_page(page)
+        self.follow(page['links'], page['final_url'])
+
+    async def _robots_for(self, client, url: str, loading):
+        origin = origin_of(url)
+        if origin not in self.robots:
+            if origin not in loading:
+                loading[origin] = asyncio.ensure_future(fetch_robots(client, origin))
+            self.robots[origin] = await loading[origin]
+        return self.robots[origin]
+
+    async def _wait_for_slot(self, url: str):
+        """Reserve the next request slot of url's host and sleep until it comes"""
+        host = url_host(url)
+        delay = self.host_delay
+        crawl_delay = self.robots[origin_of(url)].crawl_delay(ROBOTS_AGENT)
+        if crawl_delay:
+            delay = min(max(delay, float(crawl_delay)), MAX_CRAWL_DELAY_SECONDS)
+        now = time.monotonic()
+        start = max(now, self.next_slot.get(host, 0.0))
+        self.next_slot[host] = start + delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _crawl_one(self, client, limiter, url: str, loading):
+        parser = await self._robots_for(client, url, loading)
+        if not parser.can_fetch(ROBOTS_AGENT, url):
+            self.blocked.add(url)
+            print(f"Disallowed by robots.txt: {url}")
+            return
+        await self._wait_for_slot(url)
+        page = await fetch_page(client, url, limiter, self.cache)
+        if page['needs_browser']:
+            self.needs_browser.append(url)
+            return
+        self.record(url, page)
+
+    async def run_http(self, client=None):
+        """Crawl over HTTP until the frontier is empty; pages needing a browser pile up in needs_browser"""
+        limiter = HostLimiter(self.max_per_host)
+        loading = {}  # origin -> robots.txt request in flight
+        busy = 0
+        wakeup = asyncio.Event()
+        owns_client = client is None
+        if owns_client:
+            client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                headers={'User-Agent': USER_AGENT},
+                limits=httpx.Limits(max_connections=self.concurrency)
+            )
+
+        async def worker():
+            nonlocal busy
+            while True:
+                if len(self.frontier):
+                    url = self.frontier.pop(self.next_slot)
+                    busy += 1
+                    try:
+                        await self._crawl_one(client, limiter, url, loading)
+                    except Exception as e:
+                        self.failed[url] = f"{type(e).__name__}: {str(e)}"
+                        print(f"Failed: {url} ({self.failed[url]})")
+                    finally:
+                        busy -= 1
+                        wakeup.set()
+                elif not busy:
+                    return
+                else:
+                    # Other workers may still queue links, wait for one of them to finish
+                    wakeup.clear()
+                    await wakeup.wait()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if owns_client:
+                await client.aclose()
+
+    def run_browser(self, browser_fetch):
+        """Hand the pages that need JavaScript to browser_fetch([url]) -> {url: {title, content, links, changed}}.
+
+        A result taken from a cache also carries the fetched_at of the cached text.
+        """
+        urls, self.needs_browser = self.needs_browser, []
+        print(f"Opening browsers for {len(urls)} pages that need JavaScript...")
+        rendered = browser_fetch(urls)
+        for url in urls:
+            result = rendered.get(url)
+            if result is None:
+                self.record(url, page_result(url, error="browser failed"))
+                continue
+            self.record(url, page_result(url, title=result['title'], content=result['content'],
+                                         changed=result['changed'], links=result['links'],
+                                         fetched_at=result.get('fetched_at')))
+
+
+def crawl(seeds, browser_fetch=None, cache=None, on_page=None, **options):
+    """Crawl the sites of seeds; on_page(page_result dict) is called for every page fetched.
+
+    browser_fetch renders the pages plain HTTP could not get (see
+    Crawler.run_browser); without it those pages are reported as failed.
+    Returns {pages, changed: [url], failed: {url: error}, blocked}.
+    """
+    started = time.monotonic()
+    crawler = Crawler(seeds, cache=cache, on_page=on_page, **options)
+    while len(crawler.frontier):
+        asyncio.run(crawler.run_http())
+        if not crawler.needs_browser:
+            break
+        if browser_fetch is None:
+            for url in crawler.needs_browser:
+                crawler.failed[url] = "needs a browser"
+            crawler.needs_browser = []
+            break
+        crawler.run_browser(browser_fetch)
+    print(f"Crawled {crawler.pages} pages on {len(crawler.hosts)} hosts in {time.monotonic() - started:.1f}s "
+          f"({len(crawler.changed)} changed, {len(crawler.failed)} failed, {len(crawler.blocked)} disallowed)")
+    return {
+        'pages': crawler.pages,
+        'changed': crawler.changed,
+        'failed': crawler.failed,
+        'blocked': len(crawler.blocked)
+    }
@@ -0,0 +1,332 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import yaml
+
+from facets import idea_list_host
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # without msgpack the server always parses the YAML
+    msgpack = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+# Budget for cached /ideas response bodies, their compressed copies included
+MAX_CACHED_BYTES = 64 << 20
+
+IDEA_SEPARATOR = "~~~~~~~~~~"
+SNAPSHOT_FORMAT_VERSION = 3
+
+OPTIONAL_INT_FIELDS = [
+    'totalCharacters_of_ideas_content_parent',
+    'totalwords_of_ideas_content_parent',
+    'totalTokenCount_of_ideas_content_parent',
+]
+
+
+def build_idea_metadata(org):
+    """Build the Chroma metadata dictionary for an organization with proper type checking"""
+    metadata = {
+        'organization_id': str(org['organization_id']),
+        'organization_name': str(org['organization_name']),
+        'no_of_ideas': int(org['no_of_ideas']),
+        'gsocorganization_dev_url': str(org['gsocorganization_dev_url']),
+        'idea_list_url': str(org['idea_list_url']),
+        'idea_list_host': idea_list_host(str(org['idea_list_url']))
+    }
+
+    # Add optional fields only if they exist and are not None
+    for field in OPTIONAL_INT_FIELDS:
+        if field in org and org[field] is not None:
+            metadata[field] = int(org[field])
+
+    return metadata
+
+
+def compile_dataset(raw):
+    """Turn the raw YAML document into the form the server works with.
+
+    Alongside the untouched organizations list this holds one type-coerced
+    metadata dict per organization (None if it could not be coerced) and one
+    [org_position, idea_index, text] row per non-empty idea, already split on
+    the ~~~~~~~~~~ separator.
+    """
+    organizations = raw['organizations']
+    org_metadata = []
+    for org in organizations:
+        try:
+            org_metadata.append(build_idea_metadata(org))
+        except Exception as e:
+            print(f"  Error building metadata for {org.get('organization_name')}: {str(e)}")
+            print(f"  Problematic metadata: {org}")
+            org_metadata.append(None)
+    return {'organizations': organizations, 'org_metadata': org_metadata, 'ideas': idea_rows(organizations)}
+
+
+def split_ideas(ideas_content):
+    """[(idea_index, text)] for one organization's ideas_content, empty ideas skipped"""
+    ideas = []
+    for i, idea in enumerate((ideas_content or '').split(IDEA_SEPARATOR)):
+        idea = idea.strip()
+        if idea:  # Ensure the idea is not empty
+            ideas.append((i, idea))
+    return ideas
+
+
+def idea_rows(organizations):
+    """[org_position, idea_index, text] for every idea of every organization"""
+    return [[position, i, idea]
+            for position, org in enumerate(organizations)
+            for i, idea in split_ideas(org.get('ideas_content'))]
+
+
+# libyaml's C loader when PyYAML was built with it, the pure-Python one otherwise
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def read_yaml(yaml_path):
+    with open(yaml_path, 'r', encoding='utf-8') as file:
+        return yaml.load(file, Loader=YAML_LOADER)
+
+
+class _IdeasDumper(yaml.SafeDumper):
+    """Dumps in the layout of the hand-edited file: indented lists, ideas_content as a | block"""
+
+    def increase_indent(self, flow=False, indentless=False):
+        return super().increase_indent(flow, False)
+
+
+def _represent_str(dumper, value):
+    # PyYAML falls back to a quoted scalar when a | block cannot hold the text exactly
+    return dumper.represent_scalar('tag:yaml.org,2002:str', value, style='|' if '\n' in value else None)
+
+
+_IdeasDumper.add_representer(str, _represent_str)
+
+
+def write_yaml(data, yaml_path):
+    """Atomically replace yaml_path: a crash leaves either the old file or the new one"""
+    tmp_path = f"{yaml_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        yaml.dump(data, file, Dumper=_IdeasDumper, sort_keys=False, allow_unicode=True, width=1 << 16)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, yaml_path)
+
+
+def snapshot_path_for(yaml_path):
+    return os.path.splitext(yaml_path)[0] + ".snapshot.msgpack"
+
+
+def write_snapshot(data, snapshot_path, source):
+    """Atomically write compiled data plus the identity of the YAML it came from.
+
+    The ideas rows are left out, they repeat every ideas_content and
+    read_snapshot splits them again.
+    """
+    payload = {
+        'organizations': data['organizations'],
+        'org_metadata': data['org_metadata'],
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'source': source
+    }
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(msgpack.packb(payload, use_bin_type=True, default=str))
+    os.replace(tmp_path, snapshot_path)
+
+
+def read_snapshot(snapshot_path):
+    with open(snapshot_path, 'rb') as file:
+        payload = msgpack.unpackb(file.read(), raw=False, strict_map_key=False)
+    if payload.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        return None
+    payload['ideas'] = idea_rows(payload['organizations'])
+    return payload
+
+
+def build_snapshot(yaml_path, snapshot_path=None):
+    """Compile the YAML into a msgpack snapshot next to it and return the snapshot path"""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    snapshot_path = snapshot_path or snapshot_path_for(yaml_path)
+    stat = os.stat(yaml_path)
+    source = {'sha256': _file_sha256(yaml_path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    write_snapshot(compile_dataset(read_yaml(yaml_path)), snapshot_path, source)
+    return snapshot_path
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EncodedBody:
+    """A JSON body encoded once, with its ETag and lazily compressed variants"""
+
+    def __init__(self, payload, total):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.total = total
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        """Bytes held: the JSON body and the compressed copies made so far"""
+        with self._lock:
+            return len(self.body) + sum(len(encoded) for encoded in self._encoded.values())
+
+    def encode(self, encoding):
+        """Return the body compressed with encoding ('br', 'gzip' or 'identity')"""
+        if encoding == 'identity' or len(self.body) < MIN_COMPRESS_BYTES:
+            return self.body
+        with self._lock:
+            if encoding not in self._encoded:
+                if encoding == 'br':
+                    self._encoded[encoding] = brotli.compress(self.body, quality=5)
+                else:
+                    self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+            return self._encoded[encoding]
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best content coding the client accepts"""
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return 'identity'
+
+
+class IdeasDataset:
+    """The compiled ideas dataset, reloaded only when the YAML's mtime and hash change.
+
+    Data comes from the msgpack snapshot next to the YAML when one exists for
+    the current file contents. Otherwise the YAML is parsed and a fresh
+    snapshot is written for the next start. Responses for /ideas are
+    JSON-encoded once per (offset, limit, fields, exclude) variant and kept
+    until the data is reloaded, least recently used first out once they hold
+    more than MAX_CACHED_BYTES.
+    """
+
+    def __init__(self, path: str, use_snapshot: bool = True):
+        self.path = path
+        self.snapshot_path = snapshot_path_for(path)
+        self.use_snapshot = use_snapshot and msgpack is not None
+        self.sha256 = None
+        self._stat = None
+        self._data = None
+        self._variants = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_snapshot(self, signature):
+        """Return (data, sha256) from the snapshot if it matches the YAML, else None"""
+        if not self.use_snapshot or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            snapshot = read_snapshot(self.snapshot_path)
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {self.snapshot_path}: {str(e)}")
+            return None
+        if snapshot is None:
+            return None
+        source = snapshot['source']
+        if (source['mtime_ns'], source['size']) != signature and source['sha256'] != _file_sha256(self.path):
+            print(f"Snapshot {self.snapshot_path} is stale, falling back to {self.path}")
+            return None
+        data = {key: snapshot[key] for key in ('organizations', 'org_metadata', 'ideas')}
+        return data, source['sha256']
+
+    def _refresh(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._data is not None and signature == self._stat:
+            return
+        if self._data is not None and _file_sha256(self.path) == self.sha256:
+            # Touched but not changed
+            self._stat = signature
+            return
+
+        loaded = self._load_snapshot(signature)
+        if loaded is not None:
+            data, sha256 = loaded
+            origin = self.snapshot_path
+        else:
+            sha256 = _file_sha256(self.path)
+            data = compile_dataset(read_yaml(self.path))
+            origin = self.path
+            if self.use_snapshot:
+                try:
+                    write_snapshot(data, self.snapshot_path,
+                                   {'sha256': sha256, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+                except Exception as e:
+                    print(f"Could not write snapshot {self.snapshot_path}: {str(e)}")
+
+        self._data = data
+        self._stat = signature
+        self.sha256 = sha256
+        self._variants.clear()
+        print(f"Loaded {len(data['organizations'])} organizations from {origin}")
+
+    def load(self):
+        """Return the parsed dataset, reloading it if the file changed"""
+        with self._lock:
+            self._refresh()
+            return self._data
+
+    def organizations(self):
+        return self.load()['organizations']
+
+    def encoded(self, offset=0, limit=None, fields=None, exclude=None):
+        """Return the EncodedBody for one page of organizations with optional field selection"""
+        fields = tuple(sorted(fields)) if fields else None
+        exclude = tuple(sorted(exclude)) if exclude else None
+        key = (offset, limit, fields, exclude)
+        with self._lock:
+            self._refresh()
+            variant = self._variants.get(key)
+            if variant is not None:
+                self._variants.move_to_end(key)
+                return variant
+            organizations = self._data['organizations']
+
+        stop = offset + limit if limit is not None else None
+        page = organizations[offset:stop]
+        if fields or exclude:
+            page = [
+                {k: v for k, v in org.items()
+                 if (not fields or k in fields) and (not exclude or k not in exclude)}
+                for org in page
+            ]
+        variant = EncodedBody(page, total=len(organizations))
+
+        with self._lock:
+            if self._data is not None and self._data['organizations'] is organizations:
+                self._variants[key] = variant
+                cached_bytes = sum(cached.size for cached in self._variants.values())
+                while cached_bytes > MAX_CACHED_BYTES and len(self._variants) > 1:
+                    cached_bytes -= self._variants.popitem(last=False)[1].size
+        return variant
+
+
+if __name__ == "__main__":
+    # Snapshot of a YAML read with IdeasDataset directly; the server's is built by
+    # python ideas_store.py snapshot. Usage: python dataset.py [path/to/gsoc_ideasdata.yaml]
+    source_yaml = sys.argv[1] if len(sys.argv) > 1 else "gsoc_ideasdata.yaml"
+    print(f"Snapshot written to {build_snapshot(source_yaml)}")
@@ -0,0 +1,139 @@
+import json
+import re
+import zlib
+
+import numpy as np
+
+from collection_stats import ORG_TOTAL_FIELDS
+
+# Estimated Jaccard similarity of word shingles above which two chunks count as duplicates
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs share a bucket with probability 1 - (1 - s^8)^16, about 0.61 at
+# s = 0.7, 0.82 at 0.75 and 0.95 at the 0.8 threshold
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+
+# Fields of a duplicate chunk kept on its representative, enough for stats, facets and /idea
+DUPLICATE_FIELDS = (
+    'idea_id', 'organization_id', 'organization_name', 'chunk_index', 'chunk_count',
+    'chunk_start', 'chunk_end', 'idea_characters', 'idea_words'
+) + tuple(ORG_TOTAL_FIELDS)
+
+_WORD = re.compile(r"\w+")
+_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(2025)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE):
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str):
+    """MinHash signature of the text's word shingles under NUM_PERMUTATIONS universal hashes"""
+    hashes = np.array([zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)], dtype=np.uint64)
+    # a * x + b stays below 2**63 for 32-bit x and 31-bit a, b, so uint64 never overflows
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % np.uint64(_PRIME)
+    return permuted.min(axis=1)
+
+
+def find_duplicate_clusters(texts, threshold: float = DEFAULT_DUPLICATE_THRESHOLD, bands: int = LSH_BANDS):
+    """Group near-duplicate texts; returns {representative_index: [duplicate_index, ...]}.
+
+    Candidate pairs come from LSH buckets over the MinHash bands and are kept
+    only if their estimated similarity reaches threshold. The representative
+    of a cluster is its earliest text.
+    """
+    signatures = [minhash(text) for text in texts]
+    rows = NUM_PERMUTATIONS // bands
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for other in members[1:]:
+                first, other_root = find(members[0]), find(other)
+                if first == other_root:
+                    continue
+                if np.mean(signatures[members[0]] == signatures[other]) >= threshold:
+                    parent[max(first, other_root)] = min(first, other_root)
+
+    clusters = {}
+    for i in range(len(texts)):
+        root = find(i)
+        if root != i:
+            clusters.setdefault(root, []).append(i)
+    return clusters
+
+
+def duplicate_entry(metadata):
+    return {field: metadata[field] for field in DUPLICATE_FIELDS if field in metadata}
+
+
+def stored_duplicates(metadata):
+    """The duplicate chunks a stored representative stands for (empty for ordinary chunks)"""
+    duplicates = (metadata or {}).get('duplicates')
+    return json.loads(duplicates) if duplicates else []
+
+
+def dedupe_chunks(chunks, threshold: float = DEFAULT_DUPLICATE_THRESHOLD):
+    """Drop near-duplicate chunks, recording them on their cluster's representative.
+
+    chunks is a list of (document, metadata) pairs. The representative keeps
+    its own text and gains duplicate_count and a JSON list of the duplicates'
+    metadata (Chroma metadata values must be scalars), so each cluster is
+    embedded and stored once. Chunks are only folded together within one
+    organization, so a folded chunk still matches the representative's
+    organization filters and facets. Returns the kept pairs in their original order.
+    """
+    by_organization = {}
+    for i, (_, metadata) in enumerate(chunks):
+        by_organization.setdefault(metadata.get('organization_id'), []).append(i)
+    clusters = {}
+    for indexes in by_organization.values():
+        found = find_duplicate_clusters([chunks[i][0] for i in indexes], threshold)
+        for representative, members in found.items():
+            clusters[indexes[representative]] = [indexes[j] for j in members]
+    dropped = {i for members in clusters.values() for i in members}
+    kept = []
+    for i, (document, metadata) in enumerate(chunks):
+        if i in dropped:
+            continue
+        if i in clusters:
+            entries = [duplicate_entry(chunks[j][1]) for j in clusters[i]]
+            metadata = dict(metadata, duplicate_count=len(entries), duplicates=json.dumps(entries, sort_keys=True))
+        kept.append((document, metadata))
+    if dropped:
+        print(f"Dedup: {len(dropped)} near-duplicate chunks folded into {len(clusters)} representatives")
+    return kept
+
+
+def with_duplicates(result):
+    """Replace a representative's raw duplicates metadata with the list of other ideas it stands for"""
+    metadata = result.get('metadata') or {}
+    if 'duplicates' not in metadata:
+        return result
+    own_idea = metadata.get('idea_id')
+    duplicate_ideas = {}
+    for entry in stored_duplicates(metadata):
+        if entry.get('idea_id') != own_idea and entry.get('idea_id') not in duplicate_ideas:
+            duplicate_ideas[entry.get('idea_id')] = {
+                'idea_id': entry.get('idea_id'),
+                'organization_id': entry.get('organization_id'),
+                'organization_name': entry.get('organization_name')
+            }
+    metadata = {key: value for key, value in metadata.items() if key != 'duplicates'}
+    return dict(result, metadata=metadata, duplicate_ideas=list(duplicate_ideas.values()))
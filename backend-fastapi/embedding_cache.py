@@ -0,0 +1,104 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share one cache entry"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content address of an embedding: hash of model name plus normalized text"""
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk SQLite store of embeddings keyed by cache_key(model, text).
+
+    Vectors are stored as float32 blobs. The connection is shared between
+    threads, so every statement runs under a lock.
+    """
+
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get_many(self, texts):
+        """Return {key: embedding} for the texts that are already cached"""
+        keys = list({cache_key(self.model, text) for text in texts})
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, texts, embeddings):
+        """Store one embedding per text, replacing any existing entry"""
+        rows = [
+            (cache_key(self.model, text), self.model, len(embedding), array("f", embedding).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def get_or_embed(self, texts, embed_batch):
+        """Return embeddings for texts, calling embed_batch only for distinct uncached texts"""
+        texts = list(texts)
+        keys = [cache_key(self.model, text) for text in texts]
+        found = self.get_many(texts)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_texts = list(missing.values())
+            new_embeddings = embed_batch(missing_texts)
+            if len(new_embeddings) != len(missing_texts):
+                raise ValueError(f"Expected {len(missing_texts)} embeddings, got {len(new_embeddings)}")
+            self.put_many(missing_texts, new_embeddings)
+            found.update(zip(missing.keys(), new_embeddings))
+
+        return [found[key] for key in keys]
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from chunking import DEFAULT_CHUNK_MAX_TOKENS, DEFAULT_CHUNK_OVERLAP_TOKENS, chunk_idea
+from dedup import DEFAULT_DUPLICATE_THRESHOLD, dedupe_chunks
+
+# Gemini's batchEmbedContents accepts at most 100 texts per request
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_CONCURRENT_BATCHES = 4
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_SECONDS = 1.0
+DELETE_BATCH_SIZE = 500
+
+
+def idea_record_id(document, metadata):
+    """Deterministic id: idea id (organization id + idea index) + hash of the chunk text and metadata"""
+    payload = json.dumps({'document': document, 'metadata': metadata}, sort_keys=True)
+    content_hash = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    return f"{metadata['idea_id']}-{content_hash}"
+
+
+def build_idea_records(data, max_tokens=DEFAULT_CHUNK_MAX_TOKENS, overlap_tokens=DEFAULT_CHUNK_OVERLAP_TOKENS,
+                       dedup_threshold=DEFAULT_DUPLICATE_THRESHOLD):
+    """Turn a compiled dataset (see dataset.compile_dataset) into chunk records ready for embedding.
+
+    Every idea becomes one or more token-bounded chunks (see chunking.chunk_idea).
+    Each chunk's metadata carries the organization fields, the idea-level sizes,
+    the parent idea_id and the chunk's character offsets into the idea text.
+    Unless dedup_threshold is falsy, near-duplicate chunks are folded into one
+    representative record (see dedup.dedupe_chunks).
+    """
+    organizations = data['organizations']
+    chunks = []
+    for position, index, idea in data['ideas']:
+        org_metadata = data['org_metadata'][position]
+        if org_metadata is None:
+            continue
+        org = organizations[position]
+        spans = chunk_idea(idea, max_tokens, overlap_tokens)
+        for chunk_index, (start, end) in enumerate(spans):
+            document = idea[start:end]
+            metadata = dict(
+                org_metadata,
+                idea_characters=len(idea),
+                idea_words=len(idea.split()),
+                idea_id=f"{org['organization_id']}-{index}",
+                chunk_index=chunk_index,
+                chunk_count=len(spans),
+                chunk_start=start,
+                chunk_end=end
+            )
+            chunks.append((document, metadata))
+    if dedup_threshold:
+        chunks = dedupe_chunks(chunks, dedup_threshold)
+    return [
+        {'id': idea_record_id(document, metadata), 'document': document, 'metadata': metadata}
+        for document, metadata in chunks
+    ]
+
+
+def plan_sync(records, existing_ids):
+    """Compare desired records with the ids already stored.
+
+    Returns (to_upsert, to_delete): records whose id is not stored yet (new or
+    changed ideas, since the id embeds a content hash) and stored ids that no
+    longer correspond to any record.
+    """
+    existing_ids = set(existing_ids)
+    desired_ids = {record['id'] for record in records}
+    to_upsert = [record for record in records if record['id'] not in existing_ids]
+    to_delete = sorted(existing_ids - desired_ids)
+    return to_upsert, to_delete
+
+
+def chunked(items, size):
+    """Yield successive slices of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def embed_with_retry(embed_batch, texts, max_retries=DEFAULT_MAX_RETRIES,
+                     backoff_seconds=DEFAULT_BACKOFF_SECONDS, sleep=time.sleep):
+    """Embed a batch of texts, retrying with exponential backoff and jitter on failure"""
+    attempt = 0
+    while True:
+        try:
+            embeddings = embed_batch(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = backoff_seconds * (2 ** (attempt - 1))
+            delay += random.uniform(0, delay / 2)
+            print(f"  Embedding batch of {len(texts)} failed ({str(e)}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            sleep(delay)
+
+
+def flush_collection(collection):
+    """Persist a collection that buffers its writes (NumpyCollection); Chroma writes through on its own"""
+    flush = getattr(collection, 'flush', None)
+    if flush is not None:
+        flush()
+
+
+def run_ingestion(records, collection, embed_batch, batch_size=DEFAULT_BATCH_SIZE,
+                  max_concurrent_batches=DEFAULT_MAX_CONCURRENT_BATCHES,
+                  max_retries=DEFAULT_MAX_RETRIES, backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+                  sleep=time.sleep, on_upsert=None):
+    """Embed records in batches on a bounded thread pool and upsert each batch as soon as it finishes.
+
+    embed_batch takes a list of texts and returns one embedding per text, so a stub
+    embedder can be passed in place of Gemini. on_upsert, if given, is called with
+    each batch of records once it is stored. The collection is flushed once
+    at the end. Returns (loaded_count, failed_count).
+    """
+    batches = list(chunked(records, batch_size))
+    if not batches:
+        return 0, 0
+
+    print(f"Embedding {len(records)} ideas in {len(batches)} batches "
+          f"({max_concurrent_batches} at a time)")
+
+    def embed(batch):
+        texts = [record['document'] for record in batch]
+        return embed_with_retry(embed_batch, texts, max_retries=max_retries,
+                                backoff_seconds=backoff_seconds, sleep=sleep)
+
+    loaded = 0
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrent_batches) as executor:
+            futures = {executor.submit(embed, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    embeddings = future.result()
+                except Exception as e:
+                    failed += len(batch)
+                    print(f"  Giving up on batch of {len(batch)} ideas: {str(e)}")
+                    continue
+
+                # Upserts stay on this thread so the vector store only ever sees one writer
+                try:
+                    collection.upsert(
+                        ids=[record['id'] for record in batch],
+                        documents=[record['document'] for record in batch],
+                        embeddings=embeddings,
+                        metadatas=[record['metadata'] for record in batch]
+                    )
+                    loaded += len(batch)
+                    if on_upsert is not None:
+                        on_upsert(batch)
+                    print(f"  Upserted batch of {len(batch)} ideas ({loaded}/{len(records)})")
+                except Exception as e:
+                    failed += len(batch)
+                    print(f"Error during upsert: {str(e)}")
+                    # Print the first few metadata entries to help debug
+                    for i in range(min(5, len(batch))):
+                        print(f"Sample metadata {i}: {batch[i]['metadata']}")
+    finally:
+        # Keep the batches that landed even if ingestion is interrupted
+        flush_collection(collection)
+
+    return loaded, failed
+
+
+def sync_collection(records, collection, embed_batch, on_delete=None, **ingest_options):
+    """Bring the collection in line with records, embedding only new or changed ideas.
+
+    Stale ids are deleted after the upserts land so queries keep seeing the old
+    version of an idea until its replacement is stored. on_delete, if given, is
+    called with the metadatas of each batch of deleted records.
+    """
+    existing_ids = collection.get(include=[])['ids']
+    to_upsert, to_delete = plan_sync(records, existing_ids)
+    unchanged = len(records) - len(to_upsert)
+    print(f"Sync plan: {len(to_upsert)} new or changed, {len(to_delete)} removed, {unchanged} unchanged")
+
+    loaded, failed = run_ingestion(to_upsert, collection, embed_batch, **ingest_options)
+
+    deleted = 0
+    for batch in chunked(to_delete, DELETE_BATCH_SIZE):
+        try:
+            removed = collection.get(ids=batch, include=['metadatas']) if on_delete is not None else None
+            collection.delete(ids=batch)
+            deleted += len(batch)
+            if removed is not None:
+                on_delete(removed['metadatas'])
+        except Exception as e:
+            failed += len(batch)
+            print(f"Error deleting {len(batch)} stale ideas: {str(e)}")
+    flush_collection(collection)
+
+    return {
+        'upserted': loaded,
+        'deleted': deleted,
+        'failed': failed,
+        'unchanged': unchanged
+    }
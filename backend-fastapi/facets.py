@@ -0,0 +1,105 @@
+import threading
+from collections import Counter
+
+# Metadata fields /query results are faceted on
+FACET_FIELDS = ('organization_name', 'idea_list_host')
+
+
+def idea_list_host(url: str) -> str:
+    """Classify where an organization hosts its idea list"""
+    url = (url or '').lower()
+    if 'github.com' in url or 'github.io' in url or 'gitlab' in url:
+        return 'github'
+    if 'docs.google.com' in url:
+        return 'docs'
+    return 'other'
+
+
+def build_where(filters):
+    """Translate /query filters into a Chroma where clause (None when unfiltered)"""
+    clauses = []
+    if filters.get('organization_id') is not None:
+        clauses.append({'organization_id': str(filters['organization_id'])})
+    if filters.get('organization_name') is not None:
+        clauses.append({'organization_name': filters['organization_name']})
+    if filters.get('idea_list_host') is not None:
+        clauses.append({'idea_list_host': filters['idea_list_host']})
+    if filters.get('min_idea_characters') is not None:
+        clauses.append({'idea_characters': {'$gte': int(filters['min_idea_characters'])}})
+    if filters.get('max_idea_characters') is not None:
+        clauses.append({'idea_characters': {'$lte': int(filters['max_idea_characters'])}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+_OPERATORS = {
+    '$eq': lambda value, operand: value == operand,
+    '$ne': lambda value, operand: value != operand,
+    '$gt': lambda value, operand: value is not None and value > operand,
+    '$gte': lambda value, operand: value is not None and value >= operand,
+    '$lt': lambda value, operand: value is not None and value < operand,
+    '$lte': lambda value, operand: value is not None and value <= operand,
+    '$in': lambda value, operand: value in operand,
+    '$nin': lambda value, operand: value not in operand,
+}
+
+
+def matches_where(metadata, where):
+    """Evaluate a Chroma-style where clause against one metadata dict"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def facet_counts(metadatas):
+    """Count results per facet value, most common first"""
+    counts = {field: Counter() for field in FACET_FIELDS}
+    for metadata in metadatas:
+        for field in FACET_FIELDS:
+            value = (metadata or {}).get(field)
+            if value is not None:
+                counts[field][value] += 1
+    return {field: dict(counter.most_common()) for field, counter in counts.items()}
+
+
+class FacetIndex:
+    """Metadata of every stored idea keyed by id, for filtering lexical candidates locally.
+
+    Maintained by ingestion like SortedIdIndex; when invalidated it is rebuilt
+    once from the store on the next read.
+    """
+
+    def __init__(self):
+        self._metadatas = None
+        self._lock = threading.Lock()
+
+    def replace(self, metadatas):
+        with self._lock:
+            self._metadatas = dict(metadatas)
+
+    def invalidate(self):
+        with self._lock:
+            self._metadatas = None
+
+    def matching_ids(self, where, load_metadatas):
+        """Ids whose metadata satisfies where; load_metadatas() -> {id: metadata} rebuilds the index"""
+        with self._lock:
+            if self._metadatas is None:
+                self._metadatas = dict(load_metadatas())
+            metadatas = self._metadatas
+        return {id_ for id_, metadata in metadatas.items() if matches_where(metadata, where)}
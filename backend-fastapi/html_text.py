@@ -0,0 +1,219 @@
+"""HTML to readable text, in process, for pages fetched over HTTP and pages rendered in a browser.
+
+The page is parsed once: the text of the whole body and of the usual main
+content containers is collected in one pass, along with the link targets.
+Navigation, footers, sidebars and similar boilerplate are left out of the
+text (their links are still collected), and headings keep their level as
+Markdown "#" markers so chunking.chunk_idea can split on them.
+
+lxml parses the page when it is installed (pip install lxml), which is
+faster on large pages; otherwise the standard library's html.parser does,
+with the same result. Either way a page takes milliseconds, where reading
+the same text through WebDriver costs a round trip per element.
+"""
+import re
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, html.parser is always available
+    etree = None
+
+# Elements whose text is never content
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head', 'title', 'iframe', 'button', 'form', 'select'}
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'details', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main',
+    'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'tr', 'ul'
+}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# Page chrome rather than content; <header> only outside a content container, where it is the site header
+BOILERPLATE_TAGS = {'nav', 'footer', 'aside'}
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search'}
+_WHITESPACE = re.compile(r'\s+')
+
+# Containers tried in order, the same ones the Selenium scraper looks for
+CONTENT_SELECTORS = [
+    ('class', 'markdown-body'),  # GitHub READMEs and wikis
+    ('tag', 'main'),
+    ('tag', 'article'),
+    ('class', 'content'),
+    ('id', 'content'),
+    ('class', 'main-content'),
+    ('id', 'main'),
+    ('role', 'main'),
+]
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the text of the whole body, of every CONTENT_SELECTORS container and the link targets"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.body = []
+        self.containers = {selector: [] for selector in CONTENT_SELECTORS}
+        self.links = []
+        self._open = []  # stack of (tag, selectors opened by this element)
+        self._active = {}  # selector -> depth of the open container, first match only
+        self._skip_depth = 0
+        self._boilerplate_depth = 0
+        self._pre_depth = 0
+        self._in_title = False
+
+    def _matches(self, tag, attrs):
+        if tag not in ('main', 'article') and 'class' not in attrs and 'id' not in attrs and 'role' not in attrs:
+            return []
+        classes = (attrs.get('class') or '').split()
+        matched = []
+        for selector in CONTENT_SELECTORS:
+            kind, value = selector
+            if selector in self._active or self.containers[selector]:
+                continue
+            if (kind == 'tag' and tag == value) or (kind == 'class' and value in classes) \
+                    or (kind in ('id', 'role') and attrs.get(kind) == value):
+                matched.append(selector)
+        return matched
+
+    def _is_boilerplate(self, tag, attrs):
+        return tag in BOILERPLATE_TAGS or attrs.get('role') in BOILERPLATE_ROLES \
+            or (tag == 'header' and not self._active)
+
+    def _emit(self, text):
+        if self._boilerplate_depth:
+            return
+        self.body.append(text)
+        for selector in self._active:
+            self.containers[selector].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS and not self._skip_depth:
+                self._emit('\n')
+            return
+        attrs = dict(attrs)
+        if self._skip_depth or tag in SKIP_TAGS or 'hidden' in attrs \
+                or attrs.get('aria-hidden') == 'true':
+            self._skip_depth += 1
+            self._open.append((tag, []))
+            return
+        if tag == 'a' and attrs.get('href'):
+            self.links.append(attrs['href'])
+        if self._boilerplate_depth or self._is_boilerplate(tag, attrs):
+            # Still walked for its links, but nothing in it is text
+            self._boilerplate_depth += 1
+            self._open.append((tag, None))
+            return
+        matched = self._matches(tag, attrs)
+        for selector in matched:
+            self._active[selector] = len(self._open)
+        self._open.append((tag, matched))
+        if tag == 'pre':
+            self._pre_depth += 1
+        if tag in BLOCK_TAGS:
+            self._emit('\n\n' if tag in HEADING_TAGS or tag == 'p' else '\n')
+        if tag in HEADING_TAGS:
+            self._emit('#' * int(tag[1]) + ' ')
+        elif tag == 'li':
+            self._emit('- ')
+        elif tag in ('td', 'th'):
+            self._emit(' ')
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        if tag in VOID_TAGS:
+            return
+        # Browsers forgive unclosed elements, so unwind to the matching start tag
+        for depth in range(len(self._open) - 1, -1, -1):
+            if self._open[depth][0] == tag:
+                break
+        else:
+            return
+        while len(self._open) > depth:
+            open_tag, matched = self._open.pop()
+            if self._skip_depth:
+                self._skip_depth -= 1
+            elif matched is None:
+                self._boilerplate_depth -= 1
+            else:
+                if open_tag == 'pre':
+                    self._pre_depth -= 1
+                # List items only break before themselves, so lists stay compact
+                if open_tag in BLOCK_TAGS and open_tag != 'li':
+                    self._emit('\n\n' if open_tag in HEADING_TAGS or open_tag == 'p' else '\n')
+                for selector in matched:
+                    self._active.pop(selector, None)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if self._skip_depth:
+            return
+        self._emit(data if self._pre_depth else _WHITESPACE.sub(' ', data))
+
+
+def clean_text(text: str) -> str:
+    """Trim every line and collapse runs of blank lines"""
+    lines = [line.strip() for line in text.split('\n')]
+    text = '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def _feed_lxml(parser, html: str):
+    """Drive the extractor from lxml's parse tree instead of html.parser's tokenizer"""
+    # Comments are dropped while parsing (iterwalk would skip the text after them otherwise)
+    root = etree.fromstring(
+        html.encode('utf-8'), etree.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+    )
+    if root is None:
+        return False
+    for event, element in etree.iterwalk(root, events=('start', 'end')):
+        if event == 'start':
+            parser.handle_starttag(element.tag, element.attrib.items())
+            if element.text:
+                parser.handle_data(element.text)
+        else:
+            parser.handle_endtag(element.tag)
+            if element.tail:
+                parser.handle_data(element.tail)
+    return True
+
+
+def _extract(html: str):
+    parser = _TextExtractor()
+    if etree is not None and _feed_lxml(parser, html):
+        return parser
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def html_to_page(html: str, min_container_chars: int = 200):
+    """Like html_to_text, in the same pass: (title, text, links).
+
+    links are the href of every visible link as written in the page, so
+    relative ones still have to be resolved against the page URL.
+    """
+    parser = _extract(html)
+    title = clean_text(parser.title)
+    for selector in CONTENT_SELECTORS:
+        text = clean_text(''.join(parser.containers[selector]))
+        if text and len(text) >= min_container_chars:
+            return title, text, parser.links
+    return title, clean_text(''.join(parser.body)), parser.links
+
+
+def html_to_text(html: str, min_container_chars: int = 200):
+    """Readable text of an HTML page.
+
+    Returns (title, text). The text comes from the first content container
+    (see CONTENT_SELECTORS) holding at least min_container_chars characters,
+    falling back to the whole page without its boilerplate, with block
+    elements on their own lines and headings marked with "#".
+    """
+    title, text, _ = html_to_page(html, min_container_chars)
+    return title, text
@@ -3,26 +3,22 @@ import time
 import os
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import NoAlertPresentException, TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.keys import Keys
 import tempfile
 import shutil
 import glob
+import json
+from browser_pool import run_browser_tasks, wait_for_dom_stable, wait_for_selector, wait_until_ready
+from html_text import html_to_page
+from page_cache import PAGE_CACHE_PATH, PageCache, content_hash
+from page_fetcher import fetch_pages, revalidate
+from ideas_store import IdeasStore
+from scrape_journal import DONE, ScrapeJournal
 
-def setup_driver():
-    """Set up and configure the WebDriver"""
-    print("Setting up the WebDriver...")
-    options = webdriver.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--start-maximized')
-    options.add_argument('--disable-gpu')
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+YAML_FILE = "gsoc_ideasdata.yaml"
+# Written after every run so re-embedding can be limited to the orgs whose ideas changed
+CHANGED_ORGS_FILE = os.getenv("CHANGED_ORGS_FILE", "changed_orgs.json")
 
 def handle_popups(driver):
     """Handle different types of popups"""
@@ -46,23 +42,41 @@ def handle_popups(driver):
             if button.is_displayed():
                 print("Found close button, clicking it...")
                 button.click()
-                time.sleep(1)
+                wait_for_dom_stable(driver, timeout=2)
                 return True
     except:
         pass
     
     return False
 
-def extract_content_from_url(driver, url):
-    """Extract content from the given URL"""
+def extract_content_from_url(driver, url, cache=None):
+    """Extract content from the given URL.
+
+    With a PageCache, a page the server confirms unchanged is returned from
+    the cache without opening it, and freshly extracted text is cached.
+    """
     if not url:
         print("No URL provided")
         return ""
     
+    validators = {}
+    if cache is not None:
+        cached, validators = revalidate(url, cache)
+        if cached is not None:
+            print(f"Unchanged since the last run, using cached content for {url}")
+            return cached["content"]
+    
+    content = render_content(driver, url)
+    if cache is not None and content:
+        cache.store(url, "", content, **validators)
+    return content
+
+def render_content(driver, url):
+    """Open url in the browser and extract its content"""
     print(f"Navigating to {url}...")
     try:
         driver.get(url)
-        time.sleep(5)  # Wait for page to load
+        wait_until_ready(driver)
         
         # Handle any popups
         handle_popups(driver)
@@ -73,14 +87,14 @@ def extract_content_from_url(driver, url):
         if "google.com/document" in url:
             print("Google Docs detected, using simple Ctrl+A method...")
             
-    
-            time.sleep(15)
-            print("Waited 15 seconds for Google Docs to fully load")
+            # The editor renders pages progressively after the document itself has loaded
+            wait_for_selector(driver, ".kix-appview-editor", timeout=30)
+            wait_for_dom_stable(driver, quiet_seconds=1.0, timeout=30)
+            print("Google Docs editor loaded")
             
-           
             print("Pressing Ctrl+A to select all text")
             webdriver.ActionChains(driver).key_down(Keys.CONTROL).send_keys('a').key_up(Keys.CONTROL).perform()
-            time.sleep(3) 
+            wait_for_dom_stable(driver, timeout=3)
             
         
             content = driver.execute_script("return window.getSelection().toString();")
@@ -96,47 +110,21 @@ def extract_content_from_url(driver, url):
                 print(f"Body text length: {len(content)} characters")
                 return content.strip()
                 
-        elif "github.com" in url:
-            # GitHub
-            try:
-                content_element = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "markdown-body"))
-                )
-                content = content_element.text
-            except:
-                print("Fallback to body content for GitHub")
-                content = driver.find_element(By.TAG_NAME, "body").text
-                
         else:
-            # Generic website - try to get main content
-            try:
-                # Try common content containers
-                selectors = ["main", "article", ".content", "#content", ".main-content"]
-                for selector in selectors:
-                    try:
-                        element = driver.find_element(By.CSS_SELECTOR, selector)
-                        content = element.text
-                        if content.strip():
-                            break
-                    except:
-                        continue
-                
-                # If no content found, get the body text
-                if not content.strip():
-                    content = driver.find_element(By.TAG_NAME, "body").text
-            except:
+            # GitHub's markdown-body or the page's main content, from one parse of the rendered source
+            if "github.com" in url:
+                wait_for_selector(driver, ".markdown-body", timeout=10)
+            _, content, _ = html_to_page(driver.page_source)
+            if not content:
                 content = driver.find_element(By.TAG_NAME, "body").text
         
         # If no content extracted, try Ctrl+A and Ctrl+C fallback (for non-Google Docs)
         if not content.strip() and "google.com/document" not in url:
             print("Attempting Ctrl+A and Ctrl+C fallback...")
             try:
-              
-                time.sleep(5)
+                wait_for_dom_stable(driver)
                 
-          
                 webdriver.ActionChains(driver).key_down(Keys.CONTROL).send_keys('a').key_up(Keys.CONTROL).perform()
-                time.sleep(1)
                 
                
                 content = driver.execute_script("""
@@ -168,210 +156,112 @@ def extract_content_from_url(driver, url):
         print(f"Error extracting content: {str(e)}")
         return ""
 
-def update_yaml_with_ideas_content(org_id, ideas_content):
-    """Update the YAML file with ideas content for a specific organization ID only"""
-    yaml_file = "gsoc_ideasdata.yaml"
-    
-    if not os.path.exists(yaml_file):
-        print(f"YAML file not found: {yaml_file}")
-        return False
-    
-    try:
-        # Read the entire file as text
-        with open(yaml_file, 'r', encoding='utf-8') as file:
-            file_content = file.read()
-        
-        # Create a pattern to find the organization section
-        org_pattern = f"- organization_id: {org_id}"
-        
-        if org_pattern not in file_content:
-            print(f"Organization ID {org_id} not found in YAML file")
-            return False
-        
-     
-        print(f"Found organization ID {org_id} in YAML file")
-        print(f"Content to save: {len(ideas_content)} characters")
-        print(f"First 100 characters of content: {ideas_content[:100]}...")
-        
-   
-        sections = file_content.split("- organization_id:")
-        
-        # Find the section for our target organization
-        target_section = None
-        for i, section in enumerate(sections):
-            if section.strip().startswith(str(org_id)):
-                target_section = section
-                section_index = i
-                break
-        
-        if target_section is None:
-            print(f"Could not find section for organization ID {org_id}")
-            return False
-       
-        print("Replacing existing ideas_content field")
-        
-        # Split the section into lines
-        lines = target_section.split('\n')
-        new_lines = []
-        in_ideas_content = False
-        skip_next_line = False
-        
-        for line in lines:
-            if skip_next_line:
-                skip_next_line = False
-                continue
-                
-            if "ideas_content:" in line:
-                # Add the ideas_content line with pipe character
-                new_lines.append("    ideas_content: |")
-                in_ideas_content = True
-                skip_next_line = True  
-                
-      
-                for content_line in ideas_content.split('\n'):
-                    new_lines.append(f"      {content_line}")
-                
-            elif in_ideas_content and (line.startswith("      ") or line.strip() == ""):
-             
-                continue
-            elif in_ideas_content and (not line.startswith("      ")):
-                # We've reached the next field, stop skipping lines
-                in_ideas_content = False
-                new_lines.append(line)
-            else:
-                new_lines.append(line)
-        
-       
-        new_section = '\n'.join(new_lines)
-        
-        # Reconstruct the file
-        sections[section_index] = new_section
-        new_file_content = "- organization_id:".join(sections)
-        
+def get_idea_urls(store, start_id=101, end_id=185):
+    """Get idea list URLs from the ideas store for the specified range of organization IDs"""
+    return {
+        org["organization_id"]: {"url": org["idea_list_url"], "name": org["organization_name"]}
+        for org in store.organizations(start_id, end_id, with_idea_url=True)
+    }
 
-        with open(yaml_file, 'w', encoding='utf-8') as file:
-            file.write(new_file_content)
-        
-        print(f"Successfully updated organization ID {org_id} in YAML file with ideas content")
-        print(f"Content length saved: {len(ideas_content)} characters")
-        return True
-        
-    except Exception as e:
-        print(f"Error updating YAML file: {str(e)}")
-        print(f"Error details: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
-        return False
+def fetch_with_browser(pending, cache=None):
+    """Selenium fallback for the pages plain HTTP could not get: {org_id: url} -> {org_id: content}"""
+    print(f"Opening browsers for {len(pending)} pages that need JavaScript...")
+    return run_browser_tasks(extract_content_from_url, {org_id: (url, cache) for org_id, url in pending.items()})
 
-def get_idea_urls_from_yaml(start_id=101, end_id=185):
-    """Get idea list URLs from the YAML file for the specified range of organization IDs"""
-    yaml_file = "gsoc_ideasdata.yaml"
-    
-    if not os.path.exists(yaml_file):
-        print(f"YAML file not found: {yaml_file}")
-        return {}
-    
-    try:
-      
-        with open(yaml_file, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        idea_urls = {}
-        current_org_id = None
-        current_org_name = None
-        current_idea_url = None
-        
-        for line in lines:
-            line = line.strip()
-            
-      
-            if line.startswith("- organization_id:"):
-                try:
-                    current_org_id = int(line.split(":", 1)[1].strip())
-                except:
-                    current_org_id = None
-            
-           
-            elif line.startswith("organization_name:") and current_org_id is not None:
-                current_org_name = line.split(":", 1)[1].strip()
-            
-            # Check for idea list URL
-            elif line.startswith("idea_list_url:") and current_org_id is not None:
-                current_idea_url = line.split(":", 1)[1].strip()
-                
+def save_changed_orgs(journal, org_ids):
+    """Record which organizations' ideas changed in this run, including the parts before any resume"""
+    changed, unchanged, failed = [], [], []
+    for org_id in org_ids:
+        entry = journal.entry(org_id)
+        if entry is None or entry["status"] != DONE:
+            failed.append(org_id)
+        elif entry["data"].get("changed"):
+            changed.append(org_id)
+        else:
+            unchanged.append(org_id)
+    report = {
+        "finished_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "changed": sorted(changed),
+        "unchanged": sorted(unchanged),
+        "failed": sorted(failed)
+    }
+    with open(CHANGED_ORGS_FILE, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"{len(changed)} organizations changed, {len(unchanged)} unchanged, {len(failed)} failed")
+    print(f"Changed organization IDs saved to {CHANGED_ORGS_FILE}")
+    return report["changed"]
 
-                if (current_org_id is not None and 
-                    current_org_name is not None and 
-                    current_idea_url and 
-                    start_id <= current_org_id <= end_id):
-                    
-                    idea_urls[current_org_id] = {
-                        "url": current_idea_url,
-                        "name": current_org_name
-                    }
-                    
-                    # Reset for next organization
-                    current_org_id = None
-                    current_org_name = None
-                    current_idea_url = None
-        
-        return idea_urls
-    
-    except Exception as e:
-        print(f"Error reading YAML file: {str(e)}")
-        return {}
+def scrape_ideas_content(start_id=101, end_id=185, cache_path=PAGE_CACHE_PATH, resume=True, failed_only=False):
+    """Scrape ideas content from idea list URLs for organizations in the specified ID range.
 
-def scrape_ideas_content(start_id=101, end_id=185):
-    """Scrape ideas content from idea list URLs for organizations in the specified ID range"""
-    driver = setup_driver()
-    
+    Pages are fetched concurrently over plain HTTP; only the ones that need
+    JavaScript are visited with Selenium. Pages are revalidated against the
+    page cache, and organizations whose content is the same as in the ideas
+    store are left alone. The YAML is exported from the store at the end.
+    Progress is kept in the scrape journal, so an interrupted run resumes
+    with the organizations it had not finished; failed_only retries just the
+    ones that failed. Returns the IDs of the organizations whose ideas
+    content changed.
+    """
+    store = None
     try:
-        # Get idea list URLs from the YAML file
-        idea_urls = get_idea_urls_from_yaml(start_id, end_id)
+        store = IdeasStore()
+        store.sync_from_yaml(YAML_FILE)
+        idea_urls = get_idea_urls(store, start_id, end_id)
         
         if not idea_urls:
             print(f"No idea list URLs found for organizations with IDs {start_id}-{end_id}")
-            return
+            return []
         
         print(f"Found {len(idea_urls)} organizations with idea list URLs")
         
-        # Process each organization one by one
-        for org_id, org_data in idea_urls.items():
-            idea_url = org_data["url"]
-            org_name = org_data["name"]
-            
-            print(f"\nProcessing organization ID {org_id}: {org_name}")
-            print(f"Idea list URL: {idea_url}")
+        journal = ScrapeJournal("ideas_content")
+        org_ids = journal.begin(idea_urls, resume=resume, failed_only=failed_only)
+        for org_id in org_ids:
+            journal.started(org_id)
+        
+        cache = PageCache(cache_path)
+        pages = fetch_pages(
+            {org_id: idea_urls[org_id]["url"] for org_id in org_ids},
+            browser_fetch=lambda pending: fetch_with_browser(pending, cache),
+            cache=cache
+        )
+        
+        for org_id in org_ids:
+            org_data = idea_urls[org_id]
+            page = pages[org_id]
+            ideas_content = page["content"]
             
-            # Extract content from the idea list URL
-            ideas_content = extract_content_from_url(driver, idea_url)
+            print(f"\nProcessing organization ID {org_id}: {org_data['name']}")
+            print(f"Idea list URL: {org_data['url']}")
             
-            if ideas_content:
-           
-                success = update_yaml_with_ideas_content(org_id, ideas_content)
-                
-                if success:
-                    print(f"Successfully processed organization ID {org_id}")
-                    print(f"Content length: {len(ideas_content)} characters")
+            # Compare with what is stored, the page cache may be ahead of it after a crash
+            if ideas_content and store.content_hash(org_id) == content_hash(ideas_content):
+                print(f"Ideas page unchanged since the last run, skipping organization ID {org_id}")
+                journal.succeeded(org_id, changed=False)
+            elif ideas_content:
+                if store.update_organization(org_id, ideas_content=ideas_content):
+                    journal.succeeded(org_id, changed=True)
+                    print(f"Updated organization ID {org_id}, content length: {len(ideas_content)} characters")
                 else:
-                    print(f"Failed to update YAML file for organization ID {org_id}")
+                    journal.failed(org_id, "not found in the ideas store")
             else:
-                print(f"Failed to extract content for organization ID {org_id}")
-            
-    
-            time.sleep(2)
-            
+                print(f"Failed to extract content for organization ID {org_id}: {page['error'] or 'no content'}")
+                journal.failed(org_id, page['error'] or "no content")
             
             print(f"Completed processing for organization ID {org_id}")
             print("-" * 50)
         
         print(f"\nFinished processing organizations from ID {start_id} to {end_id}")
+        return save_changed_orgs(journal, idea_urls)
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+        return []
     finally:
-        print("\nClosing the browser...")
-        driver.quit()
+        # Also after an error, so the YAML has everything that reached the store
+        if store is not None:
+            store.export_if_changed(YAML_FILE)
 
 if __name__ == "__main__":
     scrape_ideas_content(start_id=101, end_id=185)
\ No newline at end of file
@@ -0,0 +1,360 @@
+"""SQLite store of organizations and their ideas, the copy every tool reads and writes.
+
+gsoc_ideasdata.yaml stays the human-editable export. import_yaml() loads it,
+export_yaml() writes it back atomically in the same layout, and
+sync_from_yaml() picks up hand edits to the file as long as the store has
+not been written since the last import or export.
+
+The database runs in WAL mode, so the API can read while a scraper writes.
+organization_id is unique and indexed, so ID ranges are index scans, and
+both organizations and the ideas split out of their ideas_content are
+indexed by content hash. Every write bumps a revision number that readers
+use to notice changes. StoreDataset keeps the compiled dataset the server
+loads in a msgpack snapshot keyed to the store and its revision, so a
+restart without changes reads neither SQLite nor the YAML.
+
+    python ideas_store.py import [gsoc_ideasdata.yaml]
+    python ideas_store.py export [gsoc_ideasdata.yaml]
+    python ideas_store.py snapshot
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from dataset import (
+    IdeasDataset, _file_sha256, compile_dataset, read_snapshot, read_yaml, split_ideas,
+    write_snapshot, write_yaml
+)
+
+IDEAS_DB_PATH = os.getenv("IDEAS_DB_PATH", "gsoc_ideas.sqlite3")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    # position keeps the file order; organization_id can be empty until test.py fills it in
+    "CREATE TABLE IF NOT EXISTS organizations ("
+    " position INTEGER PRIMARY KEY,"
+    " organization_id INTEGER UNIQUE,"
+    " organization_name TEXT,"
+    " idea_list_url TEXT,"
+    " ideas_content TEXT,"
+    " content_hash TEXT,"
+    " content_index INTEGER,"
+    " record TEXT NOT NULL,"
+    " updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS organizations_content_hash ON organizations (content_hash)",
+    "CREATE TABLE IF NOT EXISTS ideas ("
+    " position INTEGER NOT NULL,"
+    " idea_index INTEGER NOT NULL,"
+    " content TEXT NOT NULL,"
+    " content_hash TEXT NOT NULL,"
+    " PRIMARY KEY (position, idea_index))",
+    "CREATE INDEX IF NOT EXISTS ideas_content_hash ON ideas (content_hash)",
+)
+
+
+def text_hash(text) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def validate_organization_ids(organizations):
+    """Raise ValueError naming the first organization whose ID is not an integer or repeats an earlier one"""
+    seen = {}
+    for position, org in enumerate(organizations):
+        org_id = org.get("organization_id")
+        name = org.get("organization_name") or f"entry {position + 1}"
+        if org_id is None:
+            continue
+        if isinstance(org_id, bool) or not isinstance(org_id, int):
+            raise ValueError(f"Organization {name} has organization_id {org_id!r}, expected an integer")
+        if org_id in seen:
+            raise ValueError(f"Organization {name} has organization_id {org_id}, already used by {seen[org_id]}")
+        seen[org_id] = name
+
+
+class IdeasStore:
+    """Organizations and ideas in SQLite; one connection shared between threads under a lock"""
+
+    def __init__(self, path: str = IDEAS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            # Tells snapshots of a recreated database apart, its revisions start over
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('store_id', ?)", (uuid.uuid4().hex,))
+            self._conn.commit()
+
+    def _meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def store_id(self) -> str:
+        with self._lock:
+            return self._meta("store_id")
+
+    def revision(self) -> int:
+        with self._lock:
+            return int(self._meta("revision", 0))
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM organizations LIMIT 1").fetchone() is None
+
+    @staticmethod
+    def _to_org(row):
+        """Rebuild the organization dict, with ideas_content back in its place among the fields"""
+        ideas_content, content_index, record = row
+        items = list(json.loads(record).items())
+        if content_index is not None:
+            items.insert(content_index, ("ideas_content", ideas_content))
+        return dict(items)
+
+    def _select(self, where="", params=()):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT ideas_content, content_index, record FROM organizations {where} ORDER BY position",
+                params
+            ).fetchall()
+        return [self._to_org(row) for row in rows]
+
+    def document(self):
+        """Everything in the shape of the YAML file: {'organizations': [...]}"""
+        return {"organizations": self._select()}
+
+    def organizations(self, start_id=None, end_id=None, with_idea_url: bool = False):
+        """Organizations with start_id <= organization_id <= end_id (either bound optional), in file order"""
+        clauses, params = [], []
+        if start_id is not None:
+            clauses.append("organization_id >= ?")
+            params.append(start_id)
+        if end_id is not None:
+            clauses.append("organization_id <= ?")
+            params.append(end_id)
+        if with_idea_url:
+            clauses.append("idea_list_url IS NOT NULL AND idea_list_url != ''")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._select(where, params)
+
+    def organization(self, org_id):
+        found = self._select("WHERE organization_id = ?", (org_id,))
+        return found[0] if found else None
+
+    def content_hash(self, org_id):
+        """Hash of the organization's ideas_content, None if there is no such organization"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM organizations WHERE organization_id = ?", (org_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def find_ideas(self, content_hash: str):
+        """[(organization_id, idea_index)] of every idea with exactly this text hash"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT o.organization_id, i.idea_index FROM ideas i JOIN organizations o USING (position)"
+                " WHERE i.content_hash = ? ORDER BY i.position, i.idea_index",
+                (content_hash,)
+            ).fetchall()
+
+    def _bump_revision(self):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revision', 1)"
+            " ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+
+    def _write_org(self, position, org):
+        fields = list(org)
+        content_index = fields.index("ideas_content") if "ideas_content" in org else None
+        record = {key: value for key, value in org.items() if key != "ideas_content"}
+        ideas_content = org.get("ideas_content")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO organizations (position, organization_id, organization_name, idea_list_url,"
+            " ideas_content, content_hash, content_index, record, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (position, org.get("organization_id"), org.get("organization_name"), org.get("idea_list_url"),
+             ideas_content, text_hash(ideas_content), content_index, json.dumps(record, default=str), time.time())
+        )
+        self._conn.execute("DELETE FROM ideas WHERE position = ?", (position,))
+        self._conn.executemany(
+            "INSERT INTO ideas (position, idea_index, content, content_hash) VALUES (?, ?, ?, ?)",
+            [(position, i, idea, text_hash(idea)) for i, idea in split_ideas(ideas_content)]
+        )
+
+    def import_document(self, document):
+        """Replace everything with the organizations of a parsed YAML document.
+
+        Raises ValueError, leaving the store as it was, if an organization_id
+        is not an integer or is used twice.
+        """
+        organizations = document["organizations"]
+        validate_organization_ids(organizations)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM ideas")
+                self._conn.execute("DELETE FROM organizations")
+                for position, org in enumerate(organizations):
+                    self._write_org(position, org)
+                self._bump_revision()
+        return len(organizations)
+
+    def _mark_synced(self, yaml_path):
+        stat = os.stat(yaml_path)
+        with self._lock:
+            with self._conn:
+                self._set_meta("yaml_sha256", _file_sha256(yaml_path))
+                self._set_meta("yaml_signature", f"{stat.st_mtime_ns}:{stat.st_size}")
+                self._set_meta("synced_revision", self._meta("revision", 0))
+
+    def import_yaml(self, yaml_path: str):
+        count = self.import_document(read_yaml(yaml_path))
+        self._mark_synced(yaml_path)
+        print(f"Imported {count} organizations from {yaml_path} into {self.path}")
+        return count
+
+    def export_yaml(self, yaml_path: str):
+        """Write the YAML file from the store (atomically, see dataset.write_yaml)"""
+        document = self.document()
+        write_yaml(document, yaml_path)
+        self._mark_synced(yaml_path)
+        print(f"Exported {len(document['organizations'])} organizations to {yaml_path}")
+
+    def export_if_changed(self, yaml_path: str) -> bool:
+        """Export the YAML if the store was written since the last import or export"""
+        with self._lock:
+            changed = self._meta("revision", "0") != self._meta("synced_revision", "0")
+        if changed:
+            self.export_yaml(yaml_path)
+        return changed
+
+    def sync_from_yaml(self, yaml_path: str) -> bool:
+        """Import yaml_path if it was edited since the last sync; returns whether it was imported.
+
+        When both the file and the store changed since then, the store wins
+        and the file is left alone, run an explicit import to take the file.
+        """
+        if not os.path.exists(yaml_path):
+            return False
+        stat = os.stat(yaml_path)
+        with self._lock:
+            synced_sha = self._meta("yaml_sha256")
+            synced_signature = self._meta("yaml_signature")
+            store_changed = self._meta("revision", "0") != self._meta("synced_revision", "0")
+        # Same mtime and size as at the last sync, not worth hashing the file
+        if synced_signature == f"{stat.st_mtime_ns}:{stat.st_size}" or synced_sha == _file_sha256(yaml_path):
+            return False
+        if synced_sha is not None and store_changed:
+            print(f"Both {yaml_path} and {self.path} changed since the last sync, keeping the store")
+            return False
+        try:
+            self.import_yaml(yaml_path)
+        except ValueError as e:
+            print(f"Not importing {yaml_path}, keeping the store: {str(e)}")
+            return False
+        return True
+
+    def update_organization(self, org_id, **fields) -> bool:
+        """Set fields on one organization in a single transaction; False if there is no such organization"""
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT position, ideas_content, content_index, record FROM organizations"
+                    " WHERE organization_id = ?", (org_id,)
+                ).fetchone()
+                if row is None:
+                    print(f"Organization ID {org_id} not found in {self.path}")
+                    return False
+                org = self._to_org(row[1:])
+                org.update(fields)
+                self._write_org(row[0], org)
+                self._bump_revision()
+        return True
+
+    def assign_missing_ids(self, first_id: int, last_id: int) -> int:
+        """Number organizations without an ID first_id, first_id + 1, ... up to last_id, in file order"""
+        with self._lock:
+            with self._conn:
+                rows = self._conn.execute(
+                    "SELECT position, ideas_content, content_index, record FROM organizations"
+                    " WHERE organization_id IS NULL ORDER BY position"
+                ).fetchall()
+                assigned = 0
+                for (position, *org_row), org_id in zip(rows, range(first_id, last_id + 1)):
+                    org = self._to_org(org_row)
+                    org["organization_id"] = org_id
+                    self._write_org(position, org)
+                    assigned += 1
+                if assigned:
+                    self._bump_revision()
+        return assigned
+
+
+class StoreDataset(IdeasDataset):
+    """IdeasDataset over the store, reloaded when its revision changes instead of the YAML's mtime.
+
+    The compiled data is kept in a msgpack snapshot next to the database,
+    tagged with the store's id and revision; it is used while both match and
+    rewritten whenever the data is compiled from the store again.
+    """
+
+    def __init__(self, store: IdeasStore, use_snapshot: bool = True):
+        super().__init__(store.path, use_snapshot=use_snapshot)
+        self.store = store
+
+    def _load_snapshot(self, source):
+        """Compiled data from the snapshot if it was taken of this store at this revision, else None"""
+        if not self.use_snapshot or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            snapshot = read_snapshot(self.snapshot_path)
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {self.snapshot_path}: {str(e)}")
+            return None
+        if snapshot is None or snapshot['source'] != source:
+            return None
+        return {key: snapshot[key] for key in ('organizations', 'org_metadata', 'ideas')}
+
+    def _refresh(self):
+        revision = self.store.revision()
+        if self._data is not None and revision == self._stat:
+            return
+        source = {'store_id': self.store.store_id(), 'revision': revision}
+        data = self._load_snapshot(source)
+        origin = self.snapshot_path
+        if data is None:
+            data = compile_dataset(self.store.document())
+            origin = self.store.path
+            if self.use_snapshot:
+                try:
+                    write_snapshot(data, self.snapshot_path, source)
+                except Exception as e:
+                    print(f"Could not write snapshot {self.snapshot_path}: {str(e)}")
+        self._data = data
+        self._stat = revision
+        self._variants.clear()
+        print(f"Loaded {len(data['organizations'])} organizations from {origin} (revision {revision})")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "import"
+    yaml_file = sys.argv[2] if len(sys.argv) > 2 else "gsoc_ideasdata.yaml"
+    store = IdeasStore()
+    if command == "export":
+        store.export_yaml(yaml_file)
+    elif command == "snapshot":
+        # Build step: compile the store once so the server starts from the snapshot
+        StoreDataset(store).load()
+    else:
+        store.import_yaml(yaml_file)
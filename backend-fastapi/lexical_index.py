@@ -0,0 +1,141 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+# Keeps tech terms like c++, c#, node.js and real-time together; their parts are indexed too
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+_PART_SPLIT = re.compile(r"[.\-]")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the this to was were will with
+you your we our can should would their they them these those which who what how also using use via
+""".split())
+
+RRF_K = 60
+
+
+def tokenize(text: str):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = _PART_SPLIT.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part and part not in STOPWORDS)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """Fuse several ranked id lists into [(id, score)] sorted by summed 1 / (k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """In-process BM25 inverted index over the stored idea documents.
+
+    Term frequencies per document are persisted to a JSON file; the postings
+    lists are rebuilt from them on load. sync() adds and removes only the
+    documents that changed, so it can run after every ingestion.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._postings = {}
+        self._total_length = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    for doc_id, terms in json.load(file)['documents'].items():
+                        self._add_terms(doc_id, terms)
+            except Exception as e:
+                print(f"Ignoring unreadable lexical index {path}: {str(e)}")
+                self._doc_terms, self._doc_lengths, self._postings = {}, {}, {}
+                self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def ids(self):
+        return set(self._doc_terms)
+
+    def _add_terms(self, doc_id, terms):
+        self._doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def _remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def add(self, doc_id, text):
+        with self._lock:
+            self._remove(doc_id)
+            self._add_terms(doc_id, dict(Counter(tokenize(text))))
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def sync(self, documents):
+        """Make the index hold exactly documents ({id: text}); returns True if anything changed"""
+        with self._lock:
+            stale = [doc_id for doc_id in self._doc_terms if doc_id not in documents]
+            missing = [doc_id for doc_id in documents if doc_id not in self._doc_terms]
+            for doc_id in stale:
+                self._remove(doc_id)
+            for doc_id in missing:
+                self._add_terms(doc_id, dict(Counter(tokenize(documents[doc_id]))))
+        if stale or missing:
+            print(f"Lexical index: {len(missing)} added, {len(stale)} removed, {len(self._doc_terms)} documents")
+        return bool(stale or missing)
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'documents': self._doc_terms}, file)
+            os.replace(tmp_path, self.path)
+
+    def search(self, query: str, n_results: int = 10, allowed_ids=None):
+        """Return up to n_results [(id, bm25_score)] best matches, optionally restricted to allowed_ids"""
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if n_docs == 0:
+                return []
+            average_length = self._total_length / n_docs
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if allowed_ids is not None and doc_id not in allowed_ids:
+                        continue
+                    length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
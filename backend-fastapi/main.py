@@ -1,13 +1,34 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 import chromadb
 import google.generativeai as genai
+import asyncio
+import functools
+import json
 import os
-import yaml
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal, Optional
+import numpy as np
 from dotenv import load_dotenv
-from fastapi.responses import JSONResponse
+from chunking import DEFAULT_CHUNK_MAX_TOKENS, DEFAULT_CHUNK_OVERLAP_TOKENS, aggregate_chunk_results, assemble_idea
+from collection_stats import CollectionStats
+from dataset import choose_encoding
+from dedup import DEFAULT_DUPLICATE_THRESHOLD, stored_duplicates, with_duplicates
+from embedding_cache import EmbeddingCache
+from embedding_pipeline import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENT_BATCHES,
+    build_idea_records,
+    sync_collection,
+)
+from facets import FacetIndex, build_where, facet_counts
+from ideas_store import IDEAS_DB_PATH, IdeasStore, StoreDataset
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from pagination import SortedIdIndex
+from query_cache import QueryCache, query_cache_key
+from vector_index import NumpyCollection
 
 app = FastAPI(
     title="Hi Hacker",
@@ -20,164 +41,614 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "ETag"],
 )
 
 load_dotenv()
 CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST")
 
 
+# Imported into the ideas store (IDEAS_DB_PATH) at startup when it was edited by hand
+IDEAS_YAML_PATH = "gsoc_ideasdata.yaml"
+COLLECTION_NAME = "gsoc_ideas_final_v1"
+# "chroma" queries the remote Chroma server, "numpy" searches an in-process index
+# persisted to NUMPY_INDEX_PATH.npy/.json so small deployments can skip the server
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+NUMPY_INDEX_PATH = os.getenv("NUMPY_INDEX_PATH", "gsoc_ideas_index")
+# Gemini and Chroma clients are synchronous, so request handlers run them on this
+# bounded pool instead of blocking the event loop. The Chroma HttpClient shares one
+# keep-alive httpx session (20 idle connections) across threads, so the default
+# pool size keeps every worker on a reused connection.
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "16"))
+query_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+
+
 genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-chroma_client = chromadb.HttpClient(
-    host=CHROMA_SERVER_HOST, 
-    port=8000
-)
 
+@functools.lru_cache(maxsize=None)
+def get_chroma_client():
+    return chromadb.HttpClient(
+        host=CHROMA_SERVER_HOST, 
+        port=8000
+    )
 
-class QueryRequest(BaseModel):
-    query: str
+_collection = None
+
+def open_collection(create: bool = False):
+    """Open the ideas collection on the configured vector backend"""
+    if VECTOR_BACKEND == "numpy":
+        return NumpyCollection(NUMPY_INDEX_PATH)
+    if create:
+        return get_chroma_client().get_or_create_collection(name=COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+    return get_chroma_client().get_collection(COLLECTION_NAME)
+
+def get_collection():
+    """Return the ideas collection, opening it only once"""
+    global _collection
+    if _collection is None:
+        _collection = open_collection()
+    return _collection
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the query thread pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(query_executor, functools.partial(func, *args, **kwargs))
+
+
+MAX_BATCH_QUERIES = 32
+
+class SearchOptions(BaseModel):
     n_results: int = 10  # Default value of 10 if not specified
+    # "hybrid" fuses vector and BM25 rankings, "vector" is embedding search only,
+    # "lexical" is BM25 only and needs no Gemini call
+    mode: Literal["hybrid", "vector", "lexical"] = "hybrid"
+    # Optional filters, applied before top-k
+    organization_id: Optional[str] = None
+    organization_name: Optional[str] = None
+    idea_list_host: Optional[Literal["github", "docs", "other"]] = None
+    min_idea_characters: Optional[int] = None
+    max_idea_characters: Optional[int] = None
+    # How the scores of an idea's matching chunks combine into the idea score
+    aggregate: Literal["max", "sum"] = "max"
+    
+    def filters(self):
+        return {
+            key: getattr(self, key)
+            for key in ('organization_id', 'organization_name', 'idea_list_host',
+                        'min_idea_characters', 'max_idea_characters')
+            if getattr(self, key) is not None
+        }
+    
+    def cache_key(self, query: str):
+        return query_cache_key(query, self.n_results, self.mode, self.aggregate, tuple(sorted(self.filters().items())))
+
+class QueryRequest(SearchOptions):
+    query: str
+
+class BatchQueryRequest(SearchOptions):
+    queries: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+
+STREAM_CHUNK_SIZE = 20
+SNIPPET_CHARS = 280
+
+class StreamQueryRequest(QueryRequest):
+    format: Literal["ndjson", "sse"] = "ndjson"
+    # full: best matching chunk, snippet: its first SNIPPET_CHARS characters,
+    # ids: no text (the whole idea is at /idea/{idea_id})
+    content: Literal["full", "snippet", "ids"] = "snippet"
 
 # Define a new Pydantic model for the input text
 class EmbeddingRequest(BaseModel):
     text: str
 
-def get_embedding(text: str):
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", DEFAULT_MAX_CONCURRENT_BATCHES))
+# "sync" diffs the YAML against the collection on startup, "if_empty" only loads an empty collection
+INGEST_MODE = os.getenv("INGEST_MODE", "sync")
+
+# Ideas are split into overlapping chunks of at most this many (approximate) tokens
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", DEFAULT_CHUNK_MAX_TOKENS))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", DEFAULT_CHUNK_OVERLAP_TOKENS))
+# Chunks retrieved per requested idea, so ideas with several matching chunks still fill n_results
+CHUNK_CANDIDATES_FACTOR = 3
+# Near-duplicate chunks (boilerplate repeated across an organization's ideas) are embedded and stored once; 0 disables
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", DEFAULT_DUPLICATE_THRESHOLD))
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_MODEL)
+
+# /query results keyed on normalized query text and n_results, dropped whenever ingestion changes the collection
+query_cache = QueryCache(
+    maxsize=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", "600"))
+)
+
+# Sorted ids of the collection for cursor paging in /chromadb-data
+sorted_ids = SortedIdIndex()
+# Metadata by id for filtering lexical candidates without a round trip to the store
+facet_index = FacetIndex()
+
+# Aggregates behind /chromadb-stats, updated by ingestion instead of scanning the collection per request
+COLLECTION_STATS_PATH = os.getenv("COLLECTION_STATS_PATH", "collection_stats.json")
+collection_stats = CollectionStats(COLLECTION_STATS_PATH)
+
+# BM25 index over the same idea documents, kept in step with the collection by ingestion
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "lexical_index.json")
+lexical_index = BM25Index(LEXICAL_INDEX_PATH)
+# Hybrid search fuses this many candidates (at least) from each ranking
+HYBRID_CANDIDATES = 50
+
+def embed_with_gemini(texts):
+    """Embed a list of texts with a single batched Gemini request"""
     result = genai.embed_content(
-        model="models/text-embedding-004",
-        content=text
+        model=EMBEDDING_MODEL,
+        content=list(texts)
     )
     return result['embedding']
 
-def load_ideas_to_chroma(yaml_path: str):
-    # Load YAML file
-    with open(yaml_path, 'r', encoding='utf-8') as file:
-        data = yaml.safe_load(file)
+def get_embeddings(texts):
+    """Embed texts, reading the on-disk cache before calling Gemini"""
+    return embedding_cache.get_or_embed(texts, embed_with_gemini)
+
+def get_embedding(text: str):
+    return get_embeddings([text])[0]
+
+_store = None
+_dataset = None
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = IdeasStore(IDEAS_DB_PATH)
+    return _store
+
+def get_dataset():
+    """Return the shared dataset view of the store so it is compiled once per change"""
+    global _dataset
+    if _dataset is None:
+        _dataset = StoreDataset(get_store())
+    return _dataset
+
+def load_ideas_to_chroma(embed_batch=get_embeddings):
+    data = get_dataset().load()
     
-    collection = chroma_client.get_or_create_collection(name="gsoc_ideas_final_v1", metadata={"hnsw:space": "cosine"})
+    global _collection
+    collection = _collection if _collection is not None else open_collection(create=True)
+    _collection = collection
+    ingest_options = {
+        'batch_size': EMBED_BATCH_SIZE,
+        'max_concurrent_batches': EMBED_CONCURRENCY,
+        'on_upsert': lambda batch: collection_stats.add(record['metadata'] for record in batch),
+        'on_delete': collection_stats.remove
+    }
     
-    # Check if collection is empty
-    if collection.count() == 0:
-        print("ChromaDB collection is empty. Loading data...")
-        documents = []
-        embeddings = []
-        metadatas = []
-        ids_list = []  # Create a list to store unique IDs
-        
-        for org in data['organizations']:
-            print(f"Processing organization: {org['organization_name']}")
-            ideas = org['ideas_content'].split("~~~~~~~~~~")
-            for i, idea in enumerate(ideas):
-                idea = idea.strip()
-                if idea:  # Ensure the idea is not empty
-                    try:
-                        # Create metadata dictionary with proper type checking
-                        metadata = {
-                            'organization_id': str(org['organization_id']),
-                            'organization_name': str(org['organization_name']),
-                            'no_of_ideas': int(org['no_of_ideas']),
-                            'gsocorganization_dev_url': str(org['gsocorganization_dev_url']),
-                            'idea_list_url': str(org['idea_list_url'])
-                        }
-                        
-                        # Add optional fields only if they exist and are not None
-                        if 'totalCharacters_of_ideas_content_parent' in org and org['totalCharacters_of_ideas_content_parent'] is not None:
-                            metadata['totalCharacters_of_ideas_content_parent'] = int(org['totalCharacters_of_ideas_content_parent'])
-                        
-                        if 'totalwords_of_ideas_content_parent' in org and org['totalwords_of_ideas_content_parent'] is not None:
-                            metadata['totalwords_of_ideas_content_parent'] = int(org['totalwords_of_ideas_content_parent'])
-                            
-                        if 'totalTokenCount_of_ideas_content_parent' in org and org['totalTokenCount_of_ideas_content_parent'] is not None:
-                            metadata['totalTokenCount_of_ideas_content_parent'] = int(org['totalTokenCount_of_ideas_content_parent'])
-                        
-                        # Print metadata for debugging
-                        print(f"  Idea {i+1}: Metadata = {metadata}")
-                        
-                        embedding = get_embedding(idea)
-                        documents.append(idea)
-                        embeddings.append(embedding)
-                        metadatas.append(metadata)
-                        ids_list.append(str(uuid.uuid4()))
-                    except Exception as e:
-                        print(f"  Error processing idea {i+1} from {org['organization_name']}: {str(e)}")
-                        print(f"  Problematic metadata: {org}")
-        
-        try:
-            collection.upsert(
-                ids=ids_list,
-                documents=documents,
-                embeddings=embeddings,
-                metadatas=metadatas
-            )
-            print(f"Loaded {len(documents)} ideas into ChromaDB")
-        except Exception as e:
-            print(f"Error during upsert: {str(e)}")
-            # Print the first few metadata entries to help debug
-            for i in range(min(5, len(metadatas))):
-                print(f"Sample metadata {i}: {metadatas[i]}")
-    else:
+    if collection_stats.total_chunks != collection.count():
+        # Missing or out-of-date stats document, rebuild it once from the stored metadata
+        print("Rebuilding collection stats from stored metadata...")
+        collection_stats.rebuild(collection.get(include=['metadatas'])['metadatas'])
+        collection_stats.save()
+    
+    if INGEST_MODE == "if_empty" and collection.count() > 0:
         print(f"ChromaDB collection already contains {collection.count()} documents")
+        sorted_ids.invalidate()
+        facet_index.invalidate()
+        if len(lexical_index) != collection.count():
+            stored = collection.get(include=['documents'])
+            if lexical_index.sync(dict(zip(stored['ids'], stored['documents']))):
+                lexical_index.save()
+        return
+    
+    records = build_idea_records(data, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, DEDUP_THRESHOLD)
+    summary = sync_collection(records, collection, embed_batch, **ingest_options)
+    if summary['upserted'] or summary['deleted']:
+        query_cache.invalidate()
+        if VECTOR_BACKEND != "numpy":
+            # Re-fetch the handle so the collection model reports the embedding dimension
+            _collection = open_collection()
+    collection_stats.save()
+    stored_documents = {record['id']: record['document'] for record in records}
+    if summary['failed']:
+        sorted_ids.invalidate()
+        facet_index.invalidate()
+        stored_ids = set(collection.get(include=[])['ids'])
+        stored_documents = {id_: doc for id_, doc in stored_documents.items() if id_ in stored_ids}
+    else:
+        sorted_ids.replace(stored_documents)
+        facet_index.replace((record['id'], record['metadata']) for record in records)
+    if lexical_index.sync(stored_documents):
+        lexical_index.save()
+        query_cache.invalidate()
+    print(f"Synced {len(data['ideas'])} ideas as {len(records)} chunks into the {VECTOR_BACKEND} collection: {summary}")
 
 @app.on_event("startup")
 async def startup_db_client():
     try:
         # Check if ChromaDB is ready and initialize if needed
-        yaml_path = "gsoc_ideasdata.yaml"
-        if os.path.exists(yaml_path):
-            load_ideas_to_chroma(yaml_path)
+        store = get_store()
+        store.sync_from_yaml(IDEAS_YAML_PATH)
+        if not store.is_empty():
+            load_ideas_to_chroma()
         else:
-            print(f"Warning: YAML file {yaml_path} not found")
+            print(f"Warning: no organizations in {IDEAS_DB_PATH} and YAML file {IDEAS_YAML_PATH} not found")
     except Exception as e:
         print(f"Error initializing ChromaDB: {str(e)}")
 
+def format_query_results(results, row: int = 0):
+    """Turn one row of a collection.query response into /query result dicts"""
+    formatted_results = []
+    for i in range(len(results['ids'][row])):
+        result = {'id': results['ids'][row][i]}
+        if results.get('documents') is not None:
+            result['document'] = results['documents'][row][i]
+        result['metadata'] = results['metadatas'][row][i]
+        result['similarity_score'] = 1 - results['distances'][row][i]
+        formatted_results.append(result)
+    return formatted_results
+
+def cosine_similarity(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return float(a @ b / ((np.linalg.norm(a) * np.linalg.norm(b)) or 1.0))
+
+def fetch_results(collection, ids, with_embeddings: bool = False, with_documents: bool = True):
+    """Look up ids as /query result dicts keyed by id, optionally with their stored embeddings"""
+    include = (['documents'] if with_documents else []) + ['metadatas'] + (['embeddings'] if with_embeddings else [])
+    fetched = collection.get(ids=ids, include=include)
+    by_id = {}
+    for i, id_ in enumerate(fetched['ids']):
+        by_id[id_] = {'id': id_}
+        if with_documents:
+            by_id[id_]['document'] = fetched['documents'][i]
+        by_id[id_]['metadata'] = fetched['metadatas'][i]
+        by_id[id_]['similarity_score'] = None
+        if with_embeddings:
+            by_id[id_]['embedding'] = fetched['embeddings'][i]
+    return by_id
+
+def load_stored_metadatas(collection):
+    stored = collection.get(include=['metadatas'])
+    return dict(zip(stored['ids'], stored['metadatas']))
+
+def search_chunks_batch(queries, n_results: int, mode: str = "hybrid", filters=None, include_documents: bool = True):
+    """Run several chunk searches with one batched embedding call and one collection query.
+
+    Returns one ranked list of chunk result dicts per query, in order. With
+    include_documents=False the results carry no text, which keeps large
+    result sets cheap when the text is fetched later.
+    """
+    collection = get_collection()
+    where = build_where(filters or {})
+    allowed_ids = None
+    if where and mode != "vector":
+        allowed_ids = facet_index.matching_ids(where, lambda: load_stored_metadatas(collection))
+    
+    if mode == "lexical":
+        lexical_hits = [lexical_index.search(query, n_results, allowed_ids=allowed_ids) for query in queries]
+        hit_ids = list({id_ for hits in lexical_hits for id_, _ in hits})
+        by_id = fetch_results(collection, hit_ids, with_documents=include_documents) if hit_ids else {}
+        batch_results = []
+        for hits in lexical_hits:
+            # BM25 scores are unbounded, report them relative to the best hit
+            best = hits[0][1] if hits else 1.0
+            batch_results.append([dict(by_id[id_], similarity_score=score / best) for id_, score in hits if id_ in by_id])
+        return batch_results
+    
+    query_embeddings = get_embeddings(queries)
+    depth = n_results if mode == "vector" else max(n_results * 2, HYBRID_CANDIDATES)
+    results = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=depth,
+        where=where,
+        include=(['documents'] if include_documents else []) + ['metadatas', 'distances']
+    )
+    vector_results = [format_query_results(results, row) for row in range(len(queries))]
+    if mode == "vector":
+        return [rows[:n_results] for rows in vector_results]
+    
+    fused_rankings = []
+    for query, rows in zip(queries, vector_results):
+        lexical_ranking = [id_ for id_, _ in lexical_index.search(query, depth, allowed_ids=allowed_ids)]
+        fused_rankings.append(reciprocal_rank_fusion([[row['id'] for row in rows], lexical_ranking])[:n_results])
+    
+    # Ideas found only lexically are fetched once for the whole batch and scored against each query
+    vector_ids = {row['id'] for rows in vector_results for row in rows}
+    missing = {id_ for fused in fused_rankings for id_, _ in fused if id_ not in vector_ids}
+    fetched = fetch_results(collection, list(missing), with_embeddings=True, with_documents=include_documents) if missing else {}
+    
+    batch_results = []
+    for query_embedding, rows, fused in zip(query_embeddings, vector_results, fused_rankings):
+        by_id = {row['id']: row for row in rows}
+        formatted_results = []
+        for id_, score in fused:
+            if id_ in by_id:
+                formatted_results.append(dict(by_id[id_], fusion_score=score))
+            elif id_ in fetched:
+                result = {key: value for key, value in fetched[id_].items() if key != 'embedding'}
+                result['similarity_score'] = cosine_similarity(fetched[id_]['embedding'], query_embedding)
+                formatted_results.append(dict(result, fusion_score=score))
+        batch_results.append(formatted_results)
+    return batch_results
+
+def search_ideas_batch(queries, n_results: int, mode: str = "hybrid", filters=None,
+                       include_documents: bool = True, aggregate: str = "max"):
+    """Search chunks for several queries and collapse the hits into the top n_results ideas per query.
+
+    Each idea result is its best matching chunk plus idea_id, idea_score and
+    matched_chunks, and duplicate_ideas when that chunk also stands for
+    near-duplicates in other ideas. With include_documents, document is the
+    whole idea (reassembled from its chunks, as /idea/{idea_id} does) and
+    matched_text the best chunk's text.
+    """
+    batch_results = search_chunks_batch(queries, n_results * CHUNK_CANDIDATES_FACTOR, mode, filters, include_documents)
+    batch_results = [
+        [with_duplicates(result) for result in aggregate_chunk_results(rows, n_results, aggregate)]
+        for rows in batch_results
+    ]
+    if include_documents:
+        # Ideas of one chunk are their chunk's text, the others are assembled once for the whole batch
+        split_ids = [
+            result['idea_id'] for results in batch_results for result in results
+            if (result.get('metadata') or {}).get('chunk_count', 1) > 1
+        ]
+        ideas = load_ideas(get_collection(), split_ids) if split_ids else {}
+        for results in batch_results:
+            for result in results:
+                result['matched_text'] = result.get('document')
+                if result['idea_id'] in ideas:
+                    result['document'] = ideas[result['idea_id']]['document']
+    return batch_results
+
+def search_ideas(query: str, n_results: int, mode: str = "hybrid", filters=None,
+                 include_documents: bool = True, aggregate: str = "max"):
+    """Run one search against the collection and lexical index and return the top ideas"""
+    return search_ideas_batch([query], n_results, mode, filters, include_documents, aggregate)[0]
+
+def query_response(formatted_results):
+    return {
+        "results": formatted_results,
+        "facets": facet_counts(result['metadata'] for result in formatted_results)
+    }
+
 @app.post("/query")
 async def query_ideas(request: QueryRequest):
     try:
-        query_embedding = get_embedding(request.query)
-        collection = chroma_client.get_collection("gsoc_ideas_final_v1")
+        filters = request.filters()
+        cache_key = request.cache_key(request.query)
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        cache_version = query_cache.version
         
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=request.n_results,  # Use the requested number of results
-            include=['documents', 'metadatas', 'distances']
+        formatted_results = await run_blocking(
+            search_ideas, request.query, request.n_results, request.mode, filters, aggregate=request.aggregate
         )
         
-        formatted_results = []
-        for i in range(len(results['documents'][0])):
-            result = {
-                'document': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'similarity_score': 1 - results['distances'][0][i]
-            }
-            formatted_results.append(result)
+        response = query_response(formatted_results)
+        query_cache.put(cache_key, response, version=cache_version)
+        return response
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/query/batch")
+async def query_ideas_batch(request: BatchQueryRequest):
+    """Answer several queries (e.g. one per interest tag) in one round trip.
+
+    Repeated queries are answered once, cached ones come from the query cache,
+    and the rest share one batched embedding call and one collection query.
+    """
+    try:
+        filters = request.filters()
+        cache_version = query_cache.version
+        
+        responses = {}
+        pending = {}
+        for query in request.queries:
+            cache_key = request.cache_key(query)
+            if cache_key in responses or cache_key in pending:
+                continue
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                responses[cache_key] = cached
+            else:
+                pending[cache_key] = query
         
-        return {"results": formatted_results}
+        if pending:
+            batch_results = await run_blocking(
+                search_ideas_batch, list(pending.values()), request.n_results, request.mode, filters,
+                aggregate=request.aggregate
+            )
+            for cache_key, formatted_results in zip(pending, batch_results):
+                responses[cache_key] = query_response(formatted_results)
+                query_cache.put(cache_key, responses[cache_key], version=cache_version)
+        
+        return {
+            "results": [
+                dict(responses[request.cache_key(query)], query=query)
+                for query in request.queries
+            ]
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def make_snippet(text: str, length: int = SNIPPET_CHARS):
+    """Cut text to roughly length characters on a word boundary"""
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + '…'
+
+def stream_event(event: str, payload, format: str):
+    data = json.dumps(payload, ensure_ascii=False)
+    if format == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return json.dumps({"event": event, "data": payload}, ensure_ascii=False) + "\n"
+
+async def stream_query_results(formatted_results, collection, content: str, format: str):
+    """Yield results in chunks, fetching idea text one chunk at a time, then the facets"""
+    try:
+        for start in range(0, len(formatted_results), STREAM_CHUNK_SIZE):
+            chunk = formatted_results[start:start + STREAM_CHUNK_SIZE]
+            documents = {}
+            if content != "ids" and any('document' not in result for result in chunk):
+                fetched = await run_blocking(collection.get, ids=[result['id'] for result in chunk], include=['documents'])
+                documents = dict(zip(fetched['ids'], fetched['documents']))
+            for rank, result in enumerate(chunk, start=start + 1):
+                # Results cached by /query carry the whole idea in document and the chunk in matched_text
+                document = result.get('matched_text', result.get('document', documents.get(result['id']))) or ''
+                result = {key: value for key, value in result.items() if key not in ('document', 'matched_text')}
+                if content != "ids":
+                    result['document'] = make_snippet(document) if content == "snippet" else document
+                yield stream_event("result", dict(result, rank=rank), format)
+        facets = facet_counts(result['metadata'] for result in formatted_results)
+        yield stream_event("done", {"count": len(formatted_results), "facets": facets}, format)
+    except Exception as e:
+        yield stream_event("error", {"detail": str(e)}, format)
+
+@app.post("/query/stream")
+async def query_ideas_stream(request: StreamQueryRequest):
+    """Stream /query results as NDJSON lines or server-sent events.
+
+    Ranking only needs ids, metadata and scores, so the idea text is fetched
+    per chunk of STREAM_CHUNK_SIZE results while streaming instead of being
+    held for the whole response. content=snippet (default) sends the start of
+    each idea's best chunk, content=ids sends none and leaves it to /idea/{idea_id}.
+    """
+    try:
+        filters = request.filters()
+        cache_key = request.cache_key(request.query)
+        cached = query_cache.get(cache_key)
+        collection = await run_blocking(get_collection)
+        if cached is not None:
+            formatted_results = cached["results"]
+        else:
+            formatted_results = await run_blocking(
+                search_ideas, request.query, request.n_results, request.mode, filters,
+                include_documents=False, aggregate=request.aggregate
+            )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
+    media_type = "text/event-stream" if request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_query_results(formatted_results, collection, request.content, request.format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def load_ideas(collection, idea_ids):
+    """Reassemble several ideas from their chunks in one lookup; {idea_id: idea} for those that have any.
+
+    Chunks that were folded into a near-duplicate representative are filled
+    in with the representative's text.
+    """
+    chunks = {idea_id: [] for idea_id in idea_ids}
+    stored = collection.get(where={'idea_id': {'$in': list(chunks)}}, include=['documents', 'metadatas'])
+    for metadata, document in zip(stored['metadatas'], stored['documents']):
+        chunks[metadata['idea_id']].append((metadata, document))
+    incomplete = {
+        idea_id for idea_id, found in chunks.items()
+        if not found or len(found) < found[0][0].get('chunk_count', 1)
+    }
+    if incomplete:
+        representatives = collection.get(where={'duplicate_count': {'$gt': 0}}, include=['documents', 'metadatas'])
+        for metadata, document in zip(representatives['metadatas'], representatives['documents']):
+            for entry in stored_duplicates(metadata):
+                if entry.get('idea_id') in incomplete:
+                    chunks[entry['idea_id']].append((entry, document))
+    ideas = {}
+    for idea_id, found in chunks.items():
+        if not found:
+            continue
+        metadata = min((metadata for metadata, _ in found), key=lambda metadata: metadata.get('chunk_index', 0))
+        ideas[idea_id] = {
+            'idea_id': idea_id,
+            'document': assemble_idea(found),
+            'metadata': {
+                key: value for key, value in metadata.items()
+                if not key.startswith('chunk_') and key not in ('duplicates', 'duplicate_count')
+            }
+        }
+    return ideas
+
+def load_idea(collection, idea_id: str):
+    """Reassemble one idea from its chunks, or None if it has none"""
+    return load_ideas(collection, [idea_id]).get(idea_id)
+
+@app.get("/idea/{idea_id}")
+async def get_idea(idea_id: str):
+    """Full text and metadata of one idea (the idea_id of a /query result), reassembled from its chunks"""
+    try:
+        collection = await run_blocking(get_collection)
+        idea = await run_blocking(load_idea, collection, idea_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if idea is None:
+        raise HTTPException(status_code=404, detail=f"Idea {idea_id} not found")
+    return idea
 
 @app.post("/test")
 async def test_embedding(request: EmbeddingRequest):
     try:
         # Get the embedding for the provided text
-        embedding = get_embedding(request.text)
+        embedding = await run_blocking(get_embedding, request.text)
         return {"embedding": embedding}  # Return the embedding as a JSON response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cache-stats")
+async def get_cache_stats():
+    return {
+        "query_cache": query_cache.stats(),
+        "embedding_cache": await run_blocking(embedding_cache.stats)
+    }
+
 @app.get("/")
 async def root():
     return {"message": "Hi Hacker , I intentionally exposed this API , happy hacking , go to /docs to see the API docs and how all api's work . This whole project is free and open source "}
 
 @app.get("/ideas")
-async def get_ideas():
+async def get_ideas(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    """Organizations from the ideas store.
+
+    Supports paging (offset/limit, total in X-Total-Count), comma-separated
+    field selection (fields=organization_id,organization_name or
+    exclude=ideas_content), ETag/If-None-Match revalidation and gzip/brotli.
+    """
     try:
-        yaml_path = "gsoc_ideasdata.yaml"
-        with open(yaml_path, 'r', encoding='utf-8') as file:
-            data = yaml.safe_load(file)
+        encoded = await run_blocking(
+            get_dataset().encoded,
+            offset=offset,
+            limit=limit,
+            fields=[f.strip() for f in fields.split(',') if f.strip()] if fields else None,
+            exclude=[f.strip() for f in exclude.split(',') if f.strip()] if exclude else None
+        )
+        headers = {
+            "ETag": encoded.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+            "X-Total-Count": str(encoded.total)
+        }
+        
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or encoded.etag in tags:
+                return Response(status_code=304, headers=headers)
         
-        # Convert to list of dictionaries for JSON response
-        ideas_list = data['organizations']
-        return JSONResponse(content=ideas_list)
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        body = await run_blocking(encoded.encode, encoding)
+        if body is not encoded.body:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -185,70 +656,67 @@ async def get_ideas():
 @app.get("/chromadb-stats")
 async def get_chromadb_stats():
     try:
-        collection = chroma_client.get_collection("gsoc_ideas_final_v1")
-        
-        # Get total count
-        total_count = collection.count()
-        
-        # Get all metadatas (without document content to reduce payload size)
-        results = collection.get(include=['metadatas'])
-        
-        # Get unique organizations
-        org_names = set()
-        if results and 'metadatas' in results and results['metadatas']:
-            for metadata in results['metadatas']:
-                if metadata and 'organization_name' in metadata:
-                    org_names.add(metadata['organization_name'])
-        
-        return {
-            "total_records": total_count,
-            "unique_organizations": len(org_names),
-            "organization_names": list(org_names),
-            "sample_records": len(results.get('ids', []))
-        }
+        # Maintained incrementally at ingest time, so this never touches the collection
+        return collection_stats.summary()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
 @app.get("/chromadb-data")
-async def get_chromadb_data(limit: int = 100, offset: int = 0):
+async def get_chromadb_data(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None
+):
+    """Page through the stored ideas in id order.
+
+    Pass the returned next_cursor as cursor to fetch the following page; offset
+    is still accepted for the first request or random access.
+    """
     try:
-        collection = chroma_client.get_collection("gsoc_ideas_final_v1")
+        collection = await run_blocking(get_collection)
         
-        # Get all IDs to handle pagination
-        all_ids = collection.get(include=[])['ids']
-        
-        # Apply pagination
-        paginated_ids = all_ids[offset:offset+limit] if offset < len(all_ids) else []
+        # Sorted ids are maintained by ingestion, so paging never lists the whole collection
+        all_ids = await run_blocking(sorted_ids.ensure, lambda: collection.get(include=[])['ids'])
+        try:
+            paginated_ids, next_cursor = SortedIdIndex.page(all_ids, limit, offset=offset, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         if not paginated_ids:
             return {
                 "total": len(all_ids),
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": None,
                 "data": []
             }
         
         # Get data for paginated IDs
-        results = collection.get(ids=paginated_ids, include=['documents', 'metadatas', 'embeddings'])
+        results = await run_blocking(collection.get, ids=paginated_ids, include=['documents', 'metadatas'])
+        # The dimension comes from the collection model instead of downloading vectors
+        embedding_size = collection.get_model().dimension
         
-        formatted_results = []
+        records = {}
         for i in range(len(results['ids'])):
-            result = {
+            records[results['ids'][i]] = {
                 'id': results['ids'][i],
                 'document': results['documents'][i],
                 'metadata': results['metadatas'][i],
-                'embedding_size': len(results['embeddings'][i]) if 'embeddings' in results else None
+                'embedding_size': embedding_size
             }
-            formatted_results.append(result)
+        formatted_results = [records[id_] for id_ in paginated_ids if id_ in records]
         
         return {
             "total": len(all_ids),
             "limit": limit,
             "offset": offset,
+            "next_cursor": next_cursor,
             "data": formatted_results
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,126 @@
+"""Local cache of fetched pages keyed by URL.
+
+Each entry keeps the page's extracted text along with what is needed to
+tell, on the next run, whether the page changed: the ETag and Last-Modified
+validators of the HTTP response, a hash of the raw response body and a hash
+of the extracted text. page_fetcher.revalidate() sends a conditional request
+with those validators and returns the cached page when the server answers
+304 or the same body comes back.
+
+static records whether the HTTP body itself holds the content. For pages
+that only render in a browser the body is a script shell that stays the same
+while the data behind it changes, so their validators are never trusted and
+such pages are always rendered again.
+
+The cache is opened lazily and can be pickled, so browser pool workers in
+other processes share it through the same SQLite file.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "page_cache.sqlite3")
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class PageCache:
+    """SQLite store of fetched pages; safe to share between threads and processes"""
+
+    def __init__(self, path: str = PAGE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " body_hash TEXT,"
+                " static INTEGER NOT NULL DEFAULT 0,"
+                " content_hash TEXT NOT NULL,"
+                " title TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " links TEXT,"
+                " fetched_at REAL NOT NULL,"
+                " checked_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, url: str):
+        """The cached page for url as a dict, or None"""
+        with self._lock:
+            cursor = self._connection().execute("SELECT * FROM pages WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            entry = dict(zip([column[0] for column in cursor.description], row))
+        entry["static"] = bool(entry["static"])
+        entry["links"] = json.loads(entry["links"]) if entry["links"] else []
+        return entry
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for a cached entry whose validators can be trusted"""
+        headers = {}
+        if entry and entry["static"]:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, title: str, content: str, links=None, etag=None, last_modified=None,
+              body_hash=None, static=False) -> bool:
+        """Save a freshly fetched page; returns whether its text differs from the cached one"""
+        new_hash = content_hash(content)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT content_hash, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+            changed = row is None or row[0] != new_hash
+            # fetched_at is when the text last changed, checked_at when it was last confirmed
+            fetched_at = now if changed else row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body_hash, static, content_hash,"
+                " title, content, links, fetched_at, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body_hash, int(bool(static)), new_hash, title or "", content,
+                 json.dumps(list(links)) if links is not None else None, fetched_at, now)
+            )
+            conn.commit()
+        return changed
+
+    def touch(self, url: str, etag=None, last_modified=None):
+        """Record that url was confirmed unchanged, keeping any validators the server sent again"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),"
+                " checked_at = ? WHERE url = ?",
+                (etag, last_modified, time.time(), url)
+            )
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {"entries": entries}
@@ -0,0 +1,250 @@
+"""Concurrent fetching of idea-list pages over plain HTTP.
+
+Most idea lists (GitHub READMEs, project wikis, static sites) are served as
+HTML and need no browser. fetch_pages() downloads them with httpx, a few at
+a time per host, and turns them into text, plus the links they hold for
+crawler.py, with html_text.html_to_page. Pages that only render with
+JavaScript come back with needs_browser=True so the caller can hand just
+those to Selenium. Public Google Docs are fetched through their plain-text
+export URL instead of a browser.
+
+With a page_cache.PageCache, requests carry the validators of the previous
+run (If-None-Match / If-Modified-Since). A 304, or a body identical to the
+cached one, returns the cached text with changed=False and nothing is parsed
+again; revalidate() does the same check for callers about to open a page in
+a browser.
+
+Nothing here is tied to the real sites, so a local fixture server works too:
+
+    python -m http.server 8000 --directory fixtures
+    python -c "from page_fetcher import fetch_pages; print(fetch_pages({1: 'http://127.0.0.1:8000/ideas.html'}))"
+"""
+import asyncio
+import random
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from html_text import html_to_page, html_to_text
+from page_cache import content_hash
+
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_MAX_PER_HOST = 2
+DEFAULT_TIMEOUT_SECONDS = 20.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_SECONDS = 1.0
+# Pages whose extracted text is shorter than this are suspected to render client-side
+MIN_TEXT_CHARS = 200
+USER_AGENT = "Mozilla/5.0 (compatible; gsoc-ideas-scraper/1.0)"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_GOOGLE_DOC = re.compile(r"https?://docs\.google\.com/document/(?:u/\d+/)?d/([A-Za-z0-9_-]+)")
+_JS_ONLY_MARKERS = (
+    'enable javascript', 'requires javascript', 'javascript is required', 'javascript is disabled',
+    '<div id="root"></div>', '<div id="app"></div>', '<div id="__next"></div>'
+)
+
+
+def google_docs_export_url(url: str):
+    """Plain-text export URL for a Google Docs document, or None for other URLs"""
+    match = _GOOGLE_DOC.match(url or '')
+    if not match:
+        return None
+    return f"https://docs.google.com/document/d/{match.group(1)}/export?format=txt"
+
+
+def plain_text(text: str) -> str:
+    """A text response as content: no byte order mark (Google Docs exports start with one), \n line ends"""
+    return text.lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def needs_javascript(html: str, text: str) -> bool:
+    """Whether an HTTP response looks like a client-side rendered shell rather than the page"""
+    if len(text) >= MIN_TEXT_CHARS:
+        return False
+    lowered = html.lower()
+    return '<script' in lowered or any(marker in lowered for marker in _JS_ONLY_MARKERS)
+
+
+def page_result(url, status=None, final_url=None, title='', content='', needs_browser=False, error=None,
+                changed=True, links=None, fetched_at=None):
+    """One fetched page; fetched_at (epoch seconds) defaults to now, cached pages keep the cache's"""
+    return {
+        'url': url,
+        'status': status,
+        'final_url': final_url or url,
+        'title': title,
+        'content': content,
+        'needs_browser': needs_browser,
+        'error': error,
+        'changed': changed,
+        'links': links or [],
+        'fetched_at': fetched_at or time.time()
+    }
+
+
+def cached_result(url, entry, status=304):
+    return page_result(url, status, title=entry['title'], content=entry['content'], changed=False,
+                       links=entry['links'], fetched_at=entry['fetched_at'])
+
+
+def response_validators(response):
+    """What a later run needs to revalidate this response"""
+    return {
+        'etag': response.headers.get('etag'),
+        'last_modified': response.headers.get('last-modified'),
+        'body_hash': content_hash(response.content)
+    }
+
+
+def is_unchanged(response, entry, validators):
+    """Whether a response to a conditional request confirms the cached entry"""
+    if entry is None or not entry['static']:
+        return False
+    return response.status_code == 304 or (response.status_code < 400 and validators['body_hash'] == entry['body_hash'])
+
+
+def revalidate(url: str, cache, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+    """Check a page against its cache entry before rendering it in a browser.
+
+    Returns (entry, validators). entry is the cached page when the server
+    confirms it is unchanged, otherwise None and validators (ETag,
+    Last-Modified, body hash, static) are to be stored with the freshly
+    rendered text. Pages cached as needing JavaScript are not requested.
+    """
+    entry = cache.get(url)
+    if entry is not None and not entry['static']:
+        return None, {}
+    try:
+        response = httpx.get(url, headers={'User-Agent': USER_AGENT, **cache.conditional_headers(entry)},
+                             follow_redirects=True, timeout=timeout)
+    except httpx.HTTPError:
+        return None, {}
+    validators = response_validators(response)
+    if is_unchanged(response, entry, validators):
+        cache.touch(url, validators['etag'], validators['last_modified'])
+        return entry, {}
+    if response.status_code >= 400:
+        return None, {}
+    if 'html' in response.headers.get('content-type', ''):
+        html = response.text
+        validators['static'] = not needs_javascript(html, html_to_text(html)[1])
+    else:
+        validators['static'] = True
+    return None, validators
+
+
+class HostLimiter:
+    """One semaphore per host so a single slow site cannot take every connection"""
+
+    def __init__(self, max_per_host: int = DEFAULT_MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._semaphores = {}
+
+    def __call__(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+
+async def fetch_page(client, url: str, limiter: HostLimiter, cache=None, max_retries: int = DEFAULT_MAX_RETRIES,
+                     backoff_seconds: float = DEFAULT_BACKOFF_SECONDS):
+    """Fetch one page and extract its text; never raises, errors are reported in the result"""
+    export_url = google_docs_export_url(url)
+    request_url = export_url or url
+    entry = cache.get(url) if cache is not None else None
+    headers = cache.conditional_headers(entry) if cache is not None else {}
+    attempt = 0
+    while True:
+        try:
+            async with limiter(request_url):
+                response = await client.get(request_url, headers=headers)
+            if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+            break
+        except httpx.HTTPError as e:
+            attempt += 1
+            if attempt > max_retries:
+                # Unreachable over plain HTTP, a browser may still get through (e.g. bot checks)
+                return page_result(url, error=str(e) or type(e).__name__, needs_browser=True)
+            delay = backoff_seconds * (2 ** (attempt - 1))
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    final_url = str(response.url)
+    validators = response_validators(response)
+    if is_unchanged(response, entry, validators):
+        cache.touch(url, validators['etag'], validators['last_modified'])
+        return cached_result(url, entry, response.status_code)
+    if response.status_code >= 400:
+        # Private Google Docs answer the export URL with a login page or 401/403
+        return page_result(url, response.status_code, final_url, error=f"HTTP {response.status_code}",
+                           needs_browser=bool(export_url) or response.status_code in RETRY_STATUSES)
+
+    content_type = response.headers.get('content-type', '')
+    links = []
+    if 'html' not in content_type and 'xml' not in content_type:
+        # Plain text and markdown files, including Google Docs exports, are already content
+        title, text, needs_browser = '', plain_text(response.text), False
+    else:
+        html = response.text
+        title, text, hrefs = html_to_page(html)
+        links = [urljoin(final_url, href) for href in hrefs]
+        # An HTML answer to the export URL is a sign-in page, not the document
+        needs_browser = bool(export_url) or needs_javascript(html, text)
+        if export_url:
+            text = ''
+
+    changed = True
+    if cache is not None and text and not needs_browser:
+        changed = cache.store(url, title, text, links, static=True, **validators)
+    return page_result(url, response.status_code, final_url, title, text, needs_browser=needs_browser,
+                       changed=changed, links=links)
+
+
+async def fetch_pages_async(urls, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                            max_per_host: int = DEFAULT_MAX_PER_HOST,
+                            timeout: float = DEFAULT_TIMEOUT_SECONDS, client=None, cache=None, **retry_options):
+    """Fetch {key: url} concurrently; returns {key: page_result dict}"""
+    limiter = HostLimiter(max_per_host)
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=max_connections)
+        )
+    try:
+        keys = list(urls)
+        results = await asyncio.gather(*(fetch_page(client, urls[key], limiter, cache, **retry_options) for key in keys))
+        return dict(zip(keys, results))
+    finally:
+        if owns_client:
+            await client.aclose()
+
+
+def fetch_pages(urls, browser_fetch=None, cache=None, **options):
+    """Fetch {key: url} over HTTP, then hand pages that need a browser to browser_fetch.
+
+    browser_fetch({key: url}) -> {key: text} is only called when at least one
+    page needs it, so a run over static pages never starts a browser.
+    Returns {key: page_result dict}; content is '' for pages that failed, and
+    with a cache changed is False for pages whose text is the same as last run.
+    """
+    results = asyncio.run(fetch_pages_async(urls, cache=cache, **options))
+    pending = {key: urls[key] for key, result in results.items() if result['needs_browser']}
+    fetched = sum(1 for result in results.values() if result['content'] and not result['needs_browser'])
+    unchanged = sum(1 for result in results.values() if not result['changed'])
+    print(f"Fetched {fetched}/{len(urls)} pages over HTTP ({unchanged} unchanged), {len(pending)} need a browser")
+    if pending and browser_fetch is not None:
+        # The browser side may write to the cache, so remember what the text was before
+        previous = {key: cache.get(url) for key, url in pending.items()} if cache is not None else {}
+        for key, text in browser_fetch(pending).items():
+            if text:
+                entry = previous.get(key)
+                changed = entry is None or entry['content_hash'] != content_hash(text)
+                results[key].update(content=text, needs_browser=False, error=None, changed=changed)
+    return results
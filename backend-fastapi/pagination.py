@@ -0,0 +1,55 @@
+import base64
+import json
+import threading
+from bisect import bisect_right
+
+
+def encode_cursor(last_id: str) -> str:
+    """Opaque cursor pointing just past last_id"""
+    payload = json.dumps({"after": last_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['after']
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class SortedIdIndex:
+    """Sorted list of every id in the collection, maintained by ingestion.
+
+    Paging by cursor is a bisect into this list followed by a fetch of just the
+    page's ids, so a deep page costs the same as the first one. When ingestion
+    cannot vouch for the exact id set it invalidates the index and the next
+    reader rebuilds it once from the store.
+    """
+
+    def __init__(self):
+        self._ids = None
+        self._lock = threading.Lock()
+
+    def replace(self, ids):
+        with self._lock:
+            self._ids = sorted(ids)
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+
+    def ensure(self, load_ids):
+        """Return the sorted ids, calling load_ids() to rebuild them if invalidated"""
+        with self._lock:
+            if self._ids is None:
+                self._ids = sorted(load_ids())
+            return self._ids
+
+    @staticmethod
+    def page(ids, limit, offset=0, cursor=None):
+        """Return (page_ids, next_cursor) for an offset or cursor page of ids"""
+        start = bisect_right(ids, decode_cursor(cursor)) if cursor else offset
+        page_ids = ids[start:start + limit]
+        next_cursor = encode_cursor(page_ids[-1]) if page_ids and start + limit < len(ids) else None
+        return page_ids, next_cursor
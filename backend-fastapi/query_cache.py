@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+from embedding_cache import normalize_text
+
+
+def query_cache_key(query: str, *options):
+    """Key on case- and whitespace-insensitive query text plus the options that shape the result"""
+    return (normalize_text(query).lower(),) + options
+
+
+class QueryCache:
+    """Size-bounded LRU cache of /query responses with a per-entry TTL.
+
+    Entries are tagged with the collection version they were computed against.
+    invalidate() bumps the version and drops every entry, and put() ignores
+    results computed against an older version, so a query that raced with
+    ingestion can never repopulate the cache with stale results.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, version=None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "collection_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
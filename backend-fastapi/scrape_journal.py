@@ -0,0 +1,163 @@
+"""Persistent journal of scrape runs, so an interrupted run resumes where it stopped.
+
+Every scraper keeps one row per organization (or other key) with its status,
+the number of attempts, the last error and a small JSON blob of data worth
+keeping between attempts, such as the page URL read from an org card, so a
+resumed run can go straight to that org. Each update is committed at once,
+so a crash or a killed process loses at most the tasks that were running.
+
+A run is unfinished while any key is pending, was left running by a crash,
+or failed with attempts to spare. begin() resumes an unfinished run and
+otherwise starts a new one.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCRAPE_JOURNAL_PATH = os.getenv("SCRAPE_JOURNAL_PATH", "scrape_journal.sqlite3")
+MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Nothing to do for this key in this run, e.g. an ID past the end of the org list
+SKIPPED = "skipped"
+
+
+class ScrapeJournal:
+    """Per-key progress of one scraper's runs, stored in SQLite"""
+
+    def __init__(self, scraper: str, path: str = SCRAPE_JOURNAL_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.scraper = scraper
+        self.path = path
+        self.max_attempts = max_attempts
+        # Set by begin(): whether the current run continues an interrupted one
+        self.resumed = False
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal ("
+                " scraper TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " last_error TEXT,"
+                " data TEXT,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (scraper, key))"
+            )
+            self._conn.commit()
+
+    def _execute(self, sql, params):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def entry(self, key):
+        """{status, attempts, last_error, data} for key, or None if it was never planned"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, attempts, last_error, data FROM journal WHERE scraper = ? AND key = ?",
+                (self.scraper, str(key))
+            ).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "attempts": row[1], "last_error": row[2], "data": json.loads(row[3] or "{}")}
+
+    def _is_open(self, entry):
+        if entry is None:
+            return False
+        return entry["status"] in (PENDING, RUNNING) or (
+            entry["status"] == FAILED and entry["attempts"] < self.max_attempts
+        )
+
+    def begin(self, keys, resume: bool = True, failed_only: bool = False):
+        """Plan a run over keys and return the ones still to do, in order.
+
+        With resume, an unfinished run continues: finished keys are skipped
+        and failed ones retried while they have attempts left. failed_only
+        retries just the keys that failed last time, attempts reset. Anything
+        else starts a new run with every key pending. Saved data is kept.
+        """
+        keys = list(keys)
+        entries = {key: self.entry(key) for key in keys}
+        self.resumed = False
+        if failed_only:
+            todo = [key for key in keys if entries[key] and entries[key]["status"] == FAILED]
+            for key in todo:
+                self._execute(
+                    "UPDATE journal SET status = ?, attempts = 0, updated_at = ? WHERE scraper = ? AND key = ?",
+                    (PENDING, time.time(), self.scraper, str(key))
+                )
+            self.resumed = True
+            print(f"[{self.scraper}] Retrying {len(todo)} failed of {len(keys)}")
+            return todo
+
+        if resume and any(self._is_open(entry) for entry in entries.values()):
+            todo = [key for key in keys if entries[key] is None or self._is_open(entries[key])]
+            for key in todo:
+                if entries[key] is None:
+                    self._set(key, PENDING)
+            self.resumed = True
+            print(f"[{self.scraper}] Resuming run: {len(keys) - len(todo)} of {len(keys)} already finished")
+            return todo
+
+        for key in keys:
+            self._execute(
+                "INSERT INTO journal (scraper, key, status, attempts, updated_at) VALUES (?, ?, ?, 0, ?)"
+                " ON CONFLICT (scraper, key) DO UPDATE SET status = excluded.status, attempts = 0,"
+                " last_error = NULL, updated_at = excluded.updated_at",
+                (self.scraper, str(key), PENDING, time.time())
+            )
+        print(f"[{self.scraper}] Starting a new run over {len(keys)}")
+        return keys
+
+    def _set(self, key, status, error=None, data=None, attempt=False):
+        self._execute(
+            "INSERT INTO journal (scraper, key, status, attempts, last_error, data, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (scraper, key) DO UPDATE SET status = excluded.status,"
+            " attempts = journal.attempts + ?, last_error = COALESCE(excluded.last_error, journal.last_error),"
+            " data = COALESCE(excluded.data, journal.data), updated_at = excluded.updated_at",
+            (self.scraper, str(key), status, int(attempt), error,
+             json.dumps(data) if data is not None else None, time.time(), int(attempt))
+        )
+
+    def remember(self, key, **data):
+        """Merge data into what is saved for key, without changing its status"""
+        entry = self.entry(key)
+        merged = dict(entry["data"] if entry else {}, **data)
+        self._set(key, entry["status"] if entry else PENDING, data=merged)
+
+    def started(self, key):
+        self._set(key, RUNNING, attempt=True)
+
+    def succeeded(self, key, **data):
+        entry = self.entry(key)
+        self._set(key, DONE, data=dict(entry["data"] if entry else {}, **data))
+
+    def failed(self, key, error):
+        self._set(key, FAILED, error=str(error))
+        entry = self.entry(key)
+        print(f"[{self.scraper}] {key} failed (attempt {entry['attempts']}/{self.max_attempts}): {error}")
+
+    def skipped(self, key, reason):
+        self._set(key, SKIPPED, error=str(reason))
+
+    def summary(self, keys=None):
+        """Count of keys per status, over keys or the whole journal of this scraper"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, status FROM journal WHERE scraper = ?", (self.scraper,)
+            ).fetchall()
+        wanted = None if keys is None else {str(key) for key in keys}
+        counts = {}
+        for key, status in rows:
+            if wanted is None or key in wanted:
+                counts[status] = counts.get(status, 0) + 1
+        return counts
@@ -1,26 +1,16 @@
 import json
-import time
 import yaml
-import os
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import NoAlertPresentException, TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from browser_pool import DEFAULT_WORKERS, BrowserPool, setup_driver, wait_for_dom_stable, wait_until_ready
+from ideas_store import IdeasStore
+from scrape_journal import ScrapeJournal
 
-def setup_driver():
-    """Set up and configure the WebDriver"""
-    print("Setting up the WebDriver...")
-    options = webdriver.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--start-maximized')
-    options.add_argument('--disable-gpu')
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+YAML_FILE = "gsoc_ideasdata.yaml"
 
 def handle_popups(driver, exclude_handles=None):
     """Handle different types of popups, but exclude specified handles"""
@@ -48,7 +38,7 @@ def handle_popups(driver, exclude_handles=None):
             if button.is_displayed():
                 print("Found close button, clicking it...")
                 button.click()
-                time.sleep(1)
+                wait_for_dom_stable(driver, timeout=2)
                 return True
     except:
         pass
@@ -69,7 +59,7 @@ def handle_popups(driver, exclude_handles=None):
                     if button.is_displayed():
                         print("Found close button in iframe, clicking it...")
                         button.click()
-                        time.sleep(1)
+                        wait_for_dom_stable(driver, timeout=2)
                         driver.switch_to.default_content()
                         return True
                 
@@ -81,258 +71,204 @@ def handle_popups(driver, exclude_handles=None):
     
     return False
 
-def update_yaml_file(org_id, org_name, org_url, ideas_url):
-    """Update the YAML file with organization data for a specific ID only"""
-    yaml_file = "gsoc_ideasdata.yaml"
+def find_ideas_url(driver):
+    """Find the ideas list link on an organization page"""
+    ideas_link_selectors = [
+        "//u[contains(text(), 'ideas list')]/..",
+        "//a[contains(text(), 'ideas list')]",
+        "//a[contains(@href, 'ideas')]",
+        "//a[contains(text(), 'Ideas')]",
+        "//a[contains(text(), 'project')]",
+        "//a[contains(text(), 'Project')]"
+    ]
     
+    try:
+        for selector in ideas_link_selectors:
+            try:
+                ideas_element = driver.find_element(By.XPATH, selector)
+                if ideas_element:
+                    ideas_url = ideas_element.get_attribute("href")
+                    if ideas_url:
+                        print(f"Ideas list URL: {ideas_url}")
+                        return ideas_url
+            except NoSuchElementException:
+                continue
+    except Exception as e:
+        print(f"Error finding ideas list URL: {str(e)}")
+    return ""
 
-    if not os.path.exists(yaml_file):
-        print(f"YAML file not found: {yaml_file}")
-        return False
+def scrape_org_page(driver, org_page_url):
+    """Browser task: open one organization page and return its URL and ideas list URL"""
+    driver.get(org_page_url)
+    wait_until_ready(driver)
+    handle_popups(driver)
+    return {'org_url': driver.current_url, 'ideas_url': find_ideas_url(driver)}
+
+def open_org_in_new_tab(driver, org_card, main_window):
+    """Fallback for cards without a link: Ctrl+click the card and read the tab it opens"""
+    before_window_handles = driver.window_handles
+    action = webdriver.ActionChains(driver)
+    action.key_down(Keys.CONTROL).click(org_card).key_up(Keys.CONTROL).perform()
     
     try:
-        
-        with open(yaml_file, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
+        WebDriverWait(driver, 10).until(EC.number_of_windows_to_be(len(before_window_handles) + 1))
+    except TimeoutException:
+        print("No new tab was detected, continuing...")
+        return None
     
-        in_target_org = False
-        found_org = False
-        updated_lines = []
-        
-        for line in lines:
-        
-            if line.strip() == "- organization_id:" or line.strip().startswith("- organization_id:"):
-             
-                in_target_org = False
-           
-            if "organization_id:" in line and str(org_id) in line:
-                in_target_org = True
-                found_org = True
-            
-        
-            if in_target_org:
-                if "organization_name:" in line:
-                    updated_lines.append(f"    organization_name: {org_name}\n")
-                    continue
-                elif "gsocorganization_dev_url:" in line:
-                    updated_lines.append(f"    gsocorganization_dev_url: {org_url}\n")
-                    continue
-                elif "idea_list_url:" in line:
-                    updated_lines.append(f"    idea_list_url: {ideas_url}\n")
-                    continue
-            
-          
-            updated_lines.append(line)
-        
-        if found_org:
-          
-            with open(yaml_file, 'w', encoding='utf-8') as file:
-                file.writelines(updated_lines)
-            
-            print(f"Updated organization ID {org_id} in YAML file")
-            return True
-        else:
-            print(f"Organization ID {org_id} not found in YAML file")
-            return False
-    except Exception as e:
-        print(f"Error updating YAML file: {str(e)}")
-        return False
+    new_tab = next(handle for handle in driver.window_handles if handle not in before_window_handles)
+    driver.switch_to.window(new_tab)
+    try:
+        wait_until_ready(driver)
+        handle_popups(driver, [new_tab])
+        return {'org_url': driver.current_url, 'ideas_url': find_ideas_url(driver)}
+    finally:
+        driver.close()
+        driver.switch_to.window(main_window)
+
+def list_organization_cards(driver, base_url):
+    """Open the organizations page with the 2025 filter and return the org cards in page order"""
+    print(f"Navigating to {base_url}...")
+    driver.get(base_url)
+    wait_until_ready(driver, selector=".org-card-container")
+    
+    # Handle any initial popups
+    handle_popups(driver)
+    
+    # Click the 2025 filter once
+    print("Clicking 2025 filter...")
+    year_2025_label = WebDriverWait(driver, 10).until(
+        EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'ui checkbox')]/label[text()='2025']"))
+    )
+    year_2025_label.click()
+    wait_for_dom_stable(driver)
+    print("2025 filter applied")
+    
+    return driver.find_elements(By.CLASS_NAME, "org-card-container")
+
+def read_organization_cards(driver, base_url, org_ids, journal):
+    """List the org cards once and save each wanted card's name and page URL in the journal.
+
+    Returns ({org_id: {name, page_url}}, {org_id: card}); the second holds the
+    cards without a link, which can only be opened by clicking them in this driver.
+    """
+    org_cards = list_organization_cards(driver, base_url)
+    print(f"Found {len(org_cards)} organizations")
+    
+    # IDs are 1-based positions in the list, so jump straight to them instead of removing cards
+    orgs = {}
+    cards_without_link = {}
+    for org_id in org_ids:
+        if org_id > len(org_cards):
+            journal.skipped(org_id, f"only {len(org_cards)} organizations listed")
+            continue
+        org_card = org_cards[org_id - 1]
+        try:
+            org_name = org_card.find_element(By.CLASS_NAME, "org-card-name-container").text
+            org_page_url = driver.execute_script(
+                "var link = arguments[0].closest('a') || arguments[0].querySelector('a[href]');"
+                "return link ? link.href : null;", org_card
+            )
+        except Exception as e:
+            journal.failed(org_id, f"Error reading organization card: {str(e)}")
+            continue
+        journal.remember(org_id, name=org_name, page_url=org_page_url)
+        orgs[org_id] = {'name': org_name, 'page_url': org_page_url}
+        if not org_page_url:
+            cards_without_link[org_id] = org_card
+    return orgs, cards_without_link
+
+def scrape_gsoc_organizations(start_id=21, end_id=185, workers=DEFAULT_WORKERS, resume=True, failed_only=False):
+    """Scrape organization and ideas list URLs for IDs start_id..end_id (positions in the 2025 list).
 
-def scrape_gsoc_organizations(start_id=21, end_id=185):
-    driver = setup_driver()
+    One browser lists the organization cards; their pages are then visited
+    by a pool of browser workers in parallel. Progress is kept in the scrape
+    journal: an interrupted run resumes with the orgs it had not finished,
+    going straight to the org pages saved from the listing, and failed_only
+    retries just the orgs that failed. Results are written to the ideas
+    store as they arrive and the YAML is exported from it at the end.
+    """
     base_url = "https://www.gsocorganizations.dev/"
-    current_id = start_id
+    journal = ScrapeJournal("organizations")
+    org_ids = journal.begin(range(start_id, end_id + 1), resume=resume, failed_only=failed_only)
+    if not org_ids:
+        print("Nothing left to scrape")
+        return
+    
+    driver = None
+    store = None
     processed_count = 0
+    for org_id in org_ids:
+        journal.started(org_id)
     
     try:
-        # Navigate to the main page
-        print(f"Navigating to {base_url}...")
-        driver.get(base_url)
-        time.sleep(5)
-        
-        # Handle any initial popups
-        handle_popups(driver)
+        # When resuming, orgs whose page URL was saved by an earlier attempt need no listing;
+        # a new run lists again since positions shift when the org list changes
+        orgs = {}
+        for org_id in org_ids if journal.resumed else []:
+            entry = journal.entry(org_id)
+            if entry and entry["data"].get("page_url"):
+                orgs[org_id] = entry["data"]
         
-        # Click the 2025 filter once
-        print("Clicking 2025 filter...")
-        year_2025_label = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'ui checkbox')]/label[text()='2025']"))
-        )
-        year_2025_label.click()
-        print("2025 filter applied")
-        time.sleep(5)
+        cards_without_link = {}
+        to_list = [org_id for org_id in org_ids if org_id not in orgs]
+        if to_list:
+            driver = setup_driver()
+            listed, cards_without_link = read_organization_cards(driver, base_url, to_list, journal)
+            orgs.update(listed)
+        print(f"Processing {len(orgs)} organizations between IDs {start_id} and {end_id}")
         
-        # Store the main window handle
-        main_window = driver.current_window_handle
-        print(f"Main window handle: {main_window}")
+        def record(org_id, page, error=None):
+            nonlocal processed_count
+            if page is None:
+                print(f"Error processing organization {org_id}")
+                journal.failed(org_id, error or "no result")
+                return
+            if not store.update_organization(org_id, organization_name=orgs[org_id]['name'],
+                                             gsocorganization_dev_url=page['org_url'],
+                                             idea_list_url=page['ideas_url']):
+                journal.failed(org_id, "not found in the ideas store")
+                return
+            journal.succeeded(org_id, org_url=page['org_url'], ideas_url=page['ideas_url'])
+            
+            print("\nSummary:")
+            print(f"Organization ID: {org_id}")
+            print(f"Organization: {orgs[org_id]['name']}")
+            print(f"Organization URL: {page['org_url']}")
+            print(f"Ideas List URL: {page['ideas_url']}")
+            processed_count += 1
         
-        # Skip the first 20 organizations
-        print(f"Skipping to organization ID {start_id}...")
-        skipped_count = 0
-        while skipped_count < start_id - 1:  
-            try:
-                org_card = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "org-card-container"))
+        store = IdeasStore()
+        store.sync_from_yaml(YAML_FILE)
+        linked = {org_id: (org['page_url'],) for org_id, org in orgs.items() if org.get('page_url')}
+        if linked:
+            with BrowserPool(min(workers, len(linked))) as pool:
+                pool.map(
+                    scrape_org_page,
+                    linked,
+                    on_result=lambda org_id, page: record(org_id, page, pool.errors.get(org_id))
                 )
-                driver.execute_script("arguments[0].remove();", org_card)
-                skipped_count += 1
-                time.sleep(0.5)
-            except Exception as e:
-                print(f"Error skipping organizations: {str(e)}")
-                break
         
-        print(f"Skipped {skipped_count} organizations, starting from ID {start_id}")
-        
-        # Process organizations from start_id to end_id
-        while current_id <= end_id:
+        for org_id, org_card in cards_without_link.items():
+            print(f"\nProcessing ID {org_id}: {orgs[org_id]['name']} (no link on card, opening it in a tab)")
             try:
-              
-                handle_popups(driver)
-                
-             
-                print(f"\nLooking for organization ID {current_id}...")
-                org_card = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "org-card-container"))
-                )
-                
-              
-                org_name = org_card.find_element(By.CLASS_NAME, "org-card-name-container").text
-                print(f"\nProcessing ID {current_id}: {org_name}")
-                
-            
-                before_window_handles = driver.window_handles
-                
-         
-                action = webdriver.ActionChains(driver)
-                action.key_down(Keys.CONTROL).click(org_card).key_up(Keys.CONTROL).perform()
-                time.sleep(3)
-                
-               
-                after_window_handles = driver.window_handles
-                
-                new_tab = None
-                for handle in after_window_handles:
-                    if handle not in before_window_handles:
-                        new_tab = handle
-                        break
-                
-                if new_tab:
-                 
-                    driver.switch_to.window(new_tab)
-                    
-                   
-                    time.sleep(5)
-                    
-                   
-                    handle_popups(driver, [new_tab])
-                    
-               
-                    time.sleep(2)
-                    
-            
-                    org_url = driver.current_url
-                    print(f"Organization URL: {org_url}")
-                    
-           
-                    ideas_url = ""
-                    try:
-                  
-                        ideas_link_selectors = [
-                            "//u[contains(text(), 'ideas list')]/..",
-                            "//a[contains(text(), 'ideas list')]",
-                            "//a[contains(@href, 'ideas')]",
-                            "//a[contains(text(), 'Ideas')]",
-                            "//a[contains(text(), 'project')]",
-                            "//a[contains(text(), 'Project')]"
-                        ]
-                        
-                        for selector in ideas_link_selectors:
-                            try:
-                                ideas_element = driver.find_element(By.XPATH, selector)
-                                if ideas_element:
-                                    ideas_url = ideas_element.get_attribute("href")
-                                    if ideas_url:
-                                        print(f"Ideas list URL: {ideas_url}")
-                                        break
-                            except NoSuchElementException:
-                                continue
-                    except Exception as e:
-                        print(f"Error finding ideas list URL: {str(e)}")
-                    
-                    
-                    update_yaml_file(current_id, org_name, org_url, ideas_url)
-                    
-                
-                    driver.close()
-                    
-                    
-                    driver.switch_to.window(main_window)
-                    time.sleep(2)
-                    
-                 
-                    print("\nSummary:")
-                    print(f"Organization ID: {current_id}")
-                    print(f"Organization: {org_name}")
-                    print(f"Organization URL: {org_url}")
-                    print(f"Ideas List URL: {ideas_url}")
-                    
-               
-                    processed_count += 1
-                else:
-                    print("No new tab was detected, continuing...")
-                
-               
-                driver.execute_script("arguments[0].remove();", org_card)
-                time.sleep(2)
-             
-                current_id += 1
-                
+                record(org_id, open_org_in_new_tab(driver, org_card, driver.current_window_handle),
+                       "no new tab opened")
             except Exception as e:
-                print(f"Error processing organization {current_id}: {str(e)}")
-             
-                current_id += 1
-                
-                # If we're stuck, try to get back to the main page
-                if driver.current_window_handle != main_window:
-                    try:
-                        driver.close()
-                        driver.switch_to.window(main_window)
-                    except:
-                        # If we can't recover, restart the browser
-                        driver.quit()
-                        driver = setup_driver()
-                        driver.get(base_url)
-                        time.sleep(5)
-                        
-                        # Reapply the 2025 filter
-                        year_2025_label = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'ui checkbox')]/label[text()='2025']"))
-                        )
-                        year_2025_label.click()
-                        time.sleep(5)
-                        
-                        # Skip to where we left off
-                        skipped_count = 0
-                        while skipped_count < current_id - 1:
-                            try:
-                                org_card = WebDriverWait(driver, 10).until(
-                                    EC.presence_of_element_located((By.CLASS_NAME, "org-card-container"))
-                                )
-                                driver.execute_script("arguments[0].remove();", org_card)
-                                skipped_count += 1
-                                time.sleep(0.5)
-                            except:
-                                break
-                
+                record(org_id, None, str(e))
+        
         print(f"\nProcessed {processed_count} organizations from ID {start_id} to {end_id}")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
     finally:
-        print("\nClosing the browser...")
-        time.sleep(3)
-        driver.quit()
+        print(f"Journal: {journal.summary(range(start_id, end_id + 1))}")
+        if driver is not None:
+            print("\nClosing the browser...")
+            driver.quit()
+        # Also after an error, so the YAML has everything that reached the store
+        if store is not None:
+            store.export_if_changed(YAML_FILE)
 
 if __name__ == "__main__":
     scrape_gsoc_organizations(start_id=21, end_id=185)
\ No newline at end of file
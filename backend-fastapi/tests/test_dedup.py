@@ -0,0 +1,21 @@
+from dedup import dedupe_chunks, stored_duplicates
+
+BOILERPLATE = ("How to apply: read the contributor guide, fix a good first issue, introduce yourself on the "
+               "mailing list and send your proposal draft to the mentors two weeks before the deadline.")
+
+
+def chunk(organization_id, idea_index, document):
+    return document, {'organization_id': str(organization_id), 'idea_id': f"{organization_id}-{idea_index}"}
+
+
+def test_duplicates_within_an_organization_are_folded():
+    kept = dedupe_chunks([chunk(1, 0, BOILERPLATE), chunk(1, 1, BOILERPLATE), chunk(1, 2, "GPU backend")])
+    assert [metadata['idea_id'] for _, metadata in kept] == ["1-0", "1-2"]
+    assert [entry['idea_id'] for entry in stored_duplicates(kept[0][1])] == ["1-1"]
+
+
+def test_duplicates_across_organizations_are_kept():
+    kept = dedupe_chunks([chunk(1, 0, BOILERPLATE), chunk(2, 0, BOILERPLATE), chunk(2, 1, BOILERPLATE)])
+    assert [metadata['idea_id'] for _, metadata in kept] == ["1-0", "2-0"]
+    assert stored_duplicates(kept[0][1]) == []
+    assert [entry['idea_id'] for entry in stored_duplicates(kept[1][1])] == ["2-1"]
@@ -0,0 +1,69 @@
+import pytest
+
+from embedding_pipeline import embed_with_retry, run_ingestion
+
+
+class FakeCollection:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.upserts.append(ids)
+
+
+class FakeEmbedder:
+    """embed_batch stub: fails the first failures[text] calls for a batch starting with text"""
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if self.failures.get(texts[0], 0) > 0:
+            self.failures[texts[0]] -= 1
+            raise RuntimeError("quota exceeded")
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def make_records(count):
+    return [{'id': f"idea-{i}", 'document': f"idea {i}", 'metadata': {'idea_id': f"1-{i}"}} for i in range(count)]
+
+
+def test_records_are_embedded_and_upserted_in_batches():
+    collection = FakeCollection()
+    embedder = FakeEmbedder()
+    upserted = []
+    loaded, failed = run_ingestion(make_records(7), collection, embedder, batch_size=3, max_concurrent_batches=1,
+                                   on_upsert=upserted.append)
+    assert (loaded, failed) == (7, 0)
+    assert [len(batch) for batch in embedder.batches] == [3, 3, 1]
+    assert sorted(id_ for ids in collection.upserts for id_ in ids) == sorted(f"idea-{i}" for i in range(7))
+    assert [[record['id'] for record in batch] for batch in upserted] == collection.upserts
+
+
+def test_failing_batch_is_retried_with_backoff():
+    embedder = FakeEmbedder({'idea 0': 2})
+    delays = []
+    embeddings = embed_with_retry(embedder, ["idea 0", "idea 1"], max_retries=3, backoff_seconds=1.0,
+                                  sleep=delays.append)
+    assert len(embeddings) == 2
+    assert len(embedder.batches) == 3
+    # Exponential backoff with up to 50% jitter: 1s then 2s
+    assert 1.0 <= delays[0] <= 1.5 and 2.0 <= delays[1] <= 3.0
+
+
+def test_retry_gives_up_after_max_retries():
+    delays = []
+    with pytest.raises(RuntimeError):
+        embed_with_retry(FakeEmbedder({'idea 0': 5}), ["idea 0"], max_retries=2, sleep=delays.append)
+    assert len(delays) == 2
+
+
+def test_batch_that_keeps_failing_is_counted_as_failed():
+    collection = FakeCollection()
+    embedder = FakeEmbedder({'idea 3': 10})
+    loaded, failed = run_ingestion(make_records(6), collection, embedder, batch_size=3, max_concurrent_batches=1,
+                                   max_retries=1, sleep=lambda delay: None)
+    assert (loaded, failed) == (3, 3)
+    assert collection.upserts == [["idea-0", "idea-1", "idea-2"]]
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import html_text
+from html_text import html_to_page, html_to_text
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+EXPECTED_TEXT = """# Project ideas
+
+Mentors have proposed the projects below. Pick one, or bring your own idea to the mailing list.
+
+## Faster configuration parser
+
+Rewrite the configuration parser so large files load in milliseconds. Skills: Python, profiling.
+
+config = load("site.toml")
+print(config.sections)
+
+## GPU backend
+
+- Port the solver kernels to CUDA
+- Difficulty: hard, details"""
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+@pytest.fixture(params=['lxml', 'html.parser'])
+def parser(request, monkeypatch):
+    """Run each test with lxml (when installed) and with the standard library parser"""
+    if request.param == 'lxml' and html_text.etree is None:
+        pytest.skip("lxml is not installed")
+    if request.param == 'html.parser':
+        monkeypatch.setattr(html_text, 'etree', None)
+    return request.param
+
+
+def test_ideas_page(parser):
+    title, text, links = html_to_page(read_fixture("ideas_page.html"))
+    assert title == "GSoC 2025 Ideas & Projects"
+    assert text == EXPECTED_TEXT
+    # Links in page chrome are still followed even though its text is left out
+    assert links == ['/', '/about', '/blog', 'ideas/gpu.html', 'https://chat.example.org']
+
+
+def test_short_page_falls_back_to_the_body_without_boilerplate(parser):
+    html = "<html><body><nav>Home</nav><main><p>Parser rewrite</p></main><p>GPU backend</p></body></html>"
+    assert html_to_text(html) == ('', "Parser rewrite\n\nGPU backend")
@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+
+from page_fetcher import HostLimiter, fetch_page
+
+ARTICLE = "<p>" + "Build a faster parser for the project's configuration files. " * 10 + "</p>"
+
+
+def fetch(url, handler):
+    """fetch_page(url) against a mock transport answering with handler(request)"""
+    requested = []
+
+    def record(request):
+        requested.append(str(request.url))
+        return handler(request)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(record), follow_redirects=True) as client:
+            return await fetch_page(client, url, HostLimiter(), max_retries=0)
+
+    return asyncio.run(run()), requested
+
+
+def test_plain_text_is_content():
+    page, _ = fetch("https://example.org/ideas.md", lambda request: httpx.Response(
+        200, headers={'content-type': 'text/markdown'}, text="# Ideas\r\n\r\nParser rewrite\r\n"))
+    assert not page['needs_browser']
+    assert page['content'] == "# Ideas\n\nParser rewrite"
+
+
+def test_static_html_is_extracted_without_a_browser():
+    html = f"<html><head><title>Ideas</title></head><body><main>{ARTICLE}<a href='/next'>next</a></main></body></html>"
+    page, _ = fetch("https://example.org/ideas/", lambda request: httpx.Response(
+        200, headers={'content-type': 'text/html'}, text=html))
+    assert not page['needs_browser']
+    assert page['title'] == "Ideas"
+    assert "faster parser" in page['content']
+    assert page['links'] == ["https://example.org/next"]
+
+
+def test_javascript_shell_needs_a_browser():
+    html = "<html><body><div id='root'></div><script src='/app.js'></script></body></html>"
+    page, _ = fetch("https://example.org/app", lambda request: httpx.Response(
+        200, headers={'content-type': 'text/html'}, text=html))
+    assert page['needs_browser']
+
+
+def test_google_doc_is_read_from_the_text_export():
+    page, requested = fetch("https://docs.google.com/document/d/abc123/edit", lambda request: httpx.Response(
+        200, headers={'content-type': 'text/plain; charset=utf-8'}, text="\ufeffIdeas\r\nParser rewrite"))
+    assert requested == ["https://docs.google.com/document/d/abc123/export?format=txt"]
+    assert not page['needs_browser']
+    assert page['content'] == "Ideas\nParser rewrite"
+
+
+def test_private_google_doc_falls_back_to_the_browser():
+    page, _ = fetch("https://docs.google.com/document/d/abc123/edit", lambda request: httpx.Response(
+        200, headers={'content-type': 'text/html'}, text="<html><body>Sign in</body></html>"))
+    assert page['needs_browser']
+    assert page['content'] == ""
+
+
+def test_unreachable_page_falls_back_to_the_browser():
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    page, _ = fetch("https://example.org/ideas", refuse)
+    assert page['needs_browser']
+    assert page['error']
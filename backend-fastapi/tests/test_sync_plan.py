@@ -0,0 +1,48 @@
+from dataset import compile_dataset
+from embedding_pipeline import build_idea_records, idea_record_id, plan_sync
+
+
+def make_dataset(ideas_content):
+    return compile_dataset({'organizations': [{
+        'organization_id': 7,
+        'organization_name': "Example Org",
+        'no_of_ideas': 2,
+        'gsocorganization_dev_url': "https://www.gsocorganizations.dev/organization/example/",
+        'idea_list_url': "https://example.org/ideas",
+        'ideas_content': ideas_content
+    }]})
+
+
+def test_idea_record_id_is_stable():
+    metadata = {'idea_id': "7-0", 'organization_name': "Example Org", 'chunk_index': 0}
+    reordered = dict(reversed(list(metadata.items())))
+    assert idea_record_id("Parser rewrite", metadata) == idea_record_id("Parser rewrite", reordered)
+    assert idea_record_id("Parser rewrite", metadata).startswith("7-0-")
+
+
+def test_idea_record_id_changes_with_content():
+    metadata = {'idea_id': "7-0", 'chunk_index': 0}
+    assert idea_record_id("Parser rewrite", metadata) != idea_record_id("Parser rewrite v2", metadata)
+    assert idea_record_id("Parser rewrite", metadata) != idea_record_id("Parser rewrite", dict(metadata, chunk_index=1))
+
+
+def test_records_keep_their_ids_across_builds():
+    content = "Parser rewrite\n~~~~~~~~~~\nGPU backend"
+    first = build_idea_records(make_dataset(content), dedup_threshold=None)
+    second = build_idea_records(make_dataset(content), dedup_threshold=None)
+    assert [record['id'] for record in first] == [record['id'] for record in second]
+    assert len(first) == 2
+
+
+def test_plan_sync_only_touches_changed_ideas():
+    before = build_idea_records(make_dataset("Parser rewrite\n~~~~~~~~~~\nGPU backend"), dedup_threshold=None)
+    after = build_idea_records(make_dataset("Parser rewrite\n~~~~~~~~~~\nGPU backend with CUDA"),
+                               dedup_threshold=None)
+    to_upsert, to_delete = plan_sync(after, [record['id'] for record in before])
+    assert [record['document'] for record in to_upsert] == ["GPU backend with CUDA"]
+    assert to_delete == [before[1]['id']]
+
+
+def test_plan_sync_with_nothing_stored_upserts_everything():
+    records = build_idea_records(make_dataset("Parser rewrite"), dedup_threshold=None)
+    assert plan_sync(records, []) == (records, [])
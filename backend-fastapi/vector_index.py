@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from facets import matches_where
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyCollection:
+    """In-process vector index exposing the subset of the Chroma collection API the app uses.
+
+    Embeddings live in one contiguous float32 matrix whose rows are L2-normalized,
+    so cosine similarity for a whole batch of queries is a single matmul. The
+    matrix is persisted to <path>.npy and memory-mapped on load; ids, documents
+    and metadatas go to <path>.json. Upserts and deletes only change memory;
+    flush() writes both files once a whole sync is done, instead of rewriting
+    them for every batch. Distances are reported as 1 - cosine similarity,
+    matching a Chroma collection created with hnsw:space=cosine.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.matrix_path = f"{path}.npy"
+        self.records_path = f"{path}.json"
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._positions = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.records_path)):
+            return
+        with open(self.records_path, 'r', encoding='utf-8') as file:
+            records = json.load(file)
+        matrix = np.load(self.matrix_path, mmap_mode='r')
+        if matrix.shape[0] != len(records['ids']):
+            print(f"Ignoring {self.path}: {matrix.shape[0]} vectors for {len(records['ids'])} records")
+            return
+        self._ids = records['ids']
+        self._documents = records['documents']
+        self._metadatas = records['metadatas']
+        self._positions = {id_: i for i, id_ in enumerate(self._ids)}
+        self._matrix = matrix
+
+    def _persist(self):
+        # Write to temporary files and rename so a crash never leaves a torn index
+        matrix_tmp = f"{self.matrix_path}.tmp"
+        with open(matrix_tmp, 'wb') as file:
+            np.save(file, self._matrix)
+        records_tmp = f"{self.records_path}.tmp"
+        with open(records_tmp, 'w', encoding='utf-8') as file:
+            json.dump({
+                'ids': self._ids,
+                'documents': self._documents,
+                'metadatas': self._metadatas
+            }, file)
+        os.replace(matrix_tmp, self.matrix_path)
+        os.replace(records_tmp, self.records_path)
+
+    def flush(self):
+        """Persist the index if anything changed since the last flush"""
+        with self._lock:
+            if self._dirty:
+                self._persist()
+                self._dirty = False
+
+    def count(self):
+        return len(self._ids)
+
+    def get_model(self):
+        """Collection description mirroring Chroma's, including the embedding dimension"""
+        matrix = self._matrix
+        return SimpleNamespace(name=os.path.basename(self.path),
+                               dimension=matrix.shape[1] if matrix.shape[0] else None)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        with self._lock:
+            matrix = self._matrix
+            if matrix.shape[0] == 0:
+                matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            elif matrix.shape[1] != vectors.shape[1]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {matrix.shape[1]}")
+
+            # Copy-on-write so queries running on other threads keep a consistent view
+            matrix = np.array(matrix)
+            new_ids = list(self._ids)
+            new_documents = list(self._documents)
+            new_metadatas = list(self._metadatas)
+            positions = dict(self._positions)
+            appended = []
+            for row, (id_, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+                if id_ in positions:
+                    position = positions[id_]
+                    matrix[position] = vectors[row]
+                    new_documents[position] = document
+                    new_metadatas[position] = metadata
+                else:
+                    positions[id_] = len(new_ids)
+                    new_ids.append(id_)
+                    new_documents.append(document)
+                    new_metadatas.append(metadata)
+                    appended.append(row)
+            if appended:
+                matrix = np.concatenate([matrix, vectors[appended]])
+
+            self._matrix = np.ascontiguousarray(matrix)
+            self._ids, self._documents, self._metadatas = new_ids, new_documents, new_metadatas
+            self._positions = positions
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            doomed = {self._positions[id_] for id_ in ids if id_ in self._positions}
+            if not doomed:
+                return
+            keep = [i for i in range(len(self._ids)) if i not in doomed]
+            self._matrix = np.ascontiguousarray(self._matrix[keep])
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._positions = {id_: i for i, id_ in enumerate(self._ids)}
+            self._dirty = True
+
+    def _rows(self, rows, include, ids, documents, metadatas, matrix):
+        result = {'ids': [ids[i] for i in rows]}
+        result['documents'] = [documents[i] for i in rows] if 'documents' in include else None
+        result['metadatas'] = [metadatas[i] for i in rows] if 'metadatas' in include else None
+        result['embeddings'] = [matrix[i].tolist() for i in rows] if 'embeddings' in include else None
+        return result
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=('metadatas', 'documents')):
+        with self._lock:
+            all_ids, documents, metadatas = self._ids, self._documents, self._metadatas
+            positions, matrix = self._positions, self._matrix
+
+        if ids is not None:
+            rows = [positions[id_] for id_ in ids if id_ in positions]
+        else:
+            rows = range(len(all_ids))
+        if where:
+            rows = [i for i in rows if matches_where(metadatas[i], where)]
+        start = offset or 0
+        stop = start + limit if limit is not None else None
+        rows = list(rows)[start:stop]
+        return self._rows(rows, include, all_ids, documents, metadatas, matrix)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=('metadatas', 'documents', 'distances')):
+        with self._lock:
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+            matrix = self._matrix
+
+        # Filter before top-k so a selective where clause still yields n_results hits
+        candidates = None
+        if where:
+            candidates = np.array([i for i in range(len(ids)) if matches_where(metadatas[i], where)], dtype=np.int64)
+
+        result = {'ids': [], 'documents': [], 'metadatas': [], 'distances': [], 'embeddings': []}
+        if len(ids) == 0 or (candidates is not None and len(candidates) == 0):
+            for key in result:
+                result[key] = [[] for _ in query_embeddings]
+            return result
+
+        queries = _normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        searched = matrix if candidates is None else matrix[candidates]
+        scores = queries @ searched.T
+        k = min(n_results, searched.shape[0])
+        for row_scores in scores:
+            if k < searched.shape[0]:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+            else:
+                top = np.arange(searched.shape[0])
+            top = top[np.argsort(-row_scores[top])]
+            row_scores = row_scores[top]
+            if candidates is not None:
+                top = candidates[top]
+            rows = self._rows(top, include, ids, documents, metadatas, matrix)
+            result['ids'].append(rows['ids'])
+            result['documents'].append(rows['documents'])
+            result['metadatas'].append(rows['metadatas'])
+            result['embeddings'].append(rows['embeddings'])
+            result['distances'].append((1.0 - row_scores).tolist() if 'distances' in include else None)
+        # Like Chroma, fields that were not included are None rather than lists of None
+        for key in ('documents', 'metadatas', 'distances', 'embeddings'):
+            if key not in include:
+                result[key] = None
+        return result